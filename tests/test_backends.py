@@ -0,0 +1,35 @@
+import numpy as np
+import pandas as pd
+import pytest
+from windml.core import backends
+from windml.core.benchmark import generate_synthetic_file
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    """Two turbine files, 'Va1_avg' is empty in the first one only."""
+    for number, name in enumerate(['R80711', 'R80721']):
+        filename = tmp_path / f'{name}.csv'
+        generate_synthetic_file(filename, 500, turbine_name=name, seed=number)
+        if number == 0:
+            df = pd.read_csv(filename)
+            df['Va1_avg'] = np.nan
+            df.to_csv(filename, index=False)
+    return tmp_path
+
+
+@pytest.mark.parametrize('backend', ['arrow', 'polars'])
+@pytest.mark.parametrize('source', ['R80711.csv', ''])
+def test_backend_matches_pandas(data_dir, backend, source):
+    if backend == 'polars':
+        pytest.importorskip('polars')
+    path = str(data_dir / source) if source else str(data_dir)
+
+    expected = backends.load(path)
+    frame = backends.load(path, backend=backend)
+    pd.testing.assert_frame_equal(backends.to_pandas(frame, backend=backend), expected)
+
+    criteria = {'year': 2013, 'month': 1, 'hour': 12, 'turbine': 'R80711'}
+    pd.testing.assert_frame_equal(
+        backends.to_pandas(backends.select_subset(frame, backend=backend, **criteria), backend=backend),
+        backends.select_subset(expected, **criteria))
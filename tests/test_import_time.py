@@ -0,0 +1,45 @@
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+# Optional backends that importing windml.core.functions must not load
+HEAVY_MODULES = ['pyarrow', 'polars', 'dask', 'distributed', 'vaex', 'modin', 'memory_profiler']
+# Import time of windml.core.functions once numpy and pandas are loaded
+BUDGET_S = 0.3
+
+# The heavy modules are blocked, so the check does not depend on what pandas imports by itself (pandas
+# imports pyarrow when it is installed, and works without it)
+SCRIPT = f"""
+import sys
+
+
+class Blocker:
+    def find_spec(self, name, path=None, target=None):
+        if name.split('.')[0] in {HEAVY_MODULES!r}:
+            raise ImportError(name)
+
+
+sys.meta_path.insert(0, Blocker())
+import numpy, pandas
+print('windml-start', file=sys.stderr)
+import windml.core.functions
+"""
+
+
+def test_functions_import_is_light():
+    root = Path(__file__).resolve().parents[1]
+    env = {**os.environ, 'PYTHONPATH': os.pathsep.join(filter(None, [str(root), os.environ.get('PYTHONPATH')]))}
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', SCRIPT], capture_output=True, text=True,
+                            env=env, cwd=root)
+    assert result.returncode == 0, result.stderr.splitlines()[-1]
+
+    # 'import time: self [us] | cumulative | imported package', for the imports done by windml only
+    lines = result.stderr.split('windml-start', 1)[1].splitlines()
+    imports = {line.split('|')[2].strip(): int(line.split('|')[1]) / 1e6
+               for line in lines if line.startswith('import time:') and line.count('|') == 2}
+
+    loaded = sorted(name for name in imports if name.split('.')[0] in HEAVY_MODULES)
+    assert not loaded, f'windml.core.functions imports {loaded}'
+    assert imports['windml.core.functions'] < BUDGET_S, \
+        f"Importing windml.core.functions takes {imports['windml.core.functions']:.2f} s"
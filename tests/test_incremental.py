@@ -0,0 +1,38 @@
+import numpy as np
+import pandas as pd
+import pytest
+from windml.machine_learning.incremental import fit_forecaster, update_forecaster
+
+
+@pytest.fixture
+def monthly_df():
+    months = pd.date_range('2013-01-01', periods=50, freq='MS')
+    values = 50 + 10 * np.sin(np.arange(len(months)) / 3) + np.random.default_rng(0).normal(size=len(months))
+    return pd.DataFrame({'Year': months.year, 'Month': months.month, 'P_avg': values})
+
+
+@pytest.mark.filterwarnings('ignore')
+@pytest.mark.parametrize('method', ['ar', 'arima'])
+def test_update_corrects_partial_last_month(monthly_df, method):
+    partial_df = monthly_df.copy()
+    partial_df.loc[45, 'P_avg'] -= 20  # The last month was partial at the first update
+
+    results = fit_forecaster(partial_df[:40], 'P_avg', method=method)
+    results = update_forecaster(results, partial_df[40:46], 'P_avg')
+    results = update_forecaster(results, monthly_df[44:], 'P_avg')
+
+    # Same parameters, filtered on the corrected series
+    expected = fit_forecaster(partial_df[:40], 'P_avg', method=method).apply(
+        fit_forecaster(monthly_df, 'P_avg', method=method).model.data.orig_endog)
+    np.testing.assert_allclose(results.forecast(3), expected.forecast(3))
+
+
+@pytest.mark.filterwarnings('ignore')
+def test_refit_after_extend_uses_whole_series(monthly_df):
+    results = fit_forecaster(monthly_df[:30], 'P_avg', method='arima')
+    results = update_forecaster(results, monthly_df[30:40], 'P_avg')
+    results = update_forecaster(results, monthly_df[40:], 'P_avg', refit=True)
+
+    expected = fit_forecaster(monthly_df, 'P_avg', method='arima')
+    assert results.nobs == len(monthly_df)
+    np.testing.assert_allclose(results.params, expected.params, rtol=1e-3)
@@ -0,0 +1,27 @@
+import numpy as np
+import pytest
+from windml.core import instrumentation
+
+
+@pytest.fixture
+def spans():
+    instrumentation.clear()
+    instrumentation.enable()
+    yield
+    instrumentation.disable()
+    instrumentation.clear()
+
+
+def test_span_rss_is_sampled_during_the_stage(spans):
+    with instrumentation.span('allocate'):
+        array = np.ones(100 * 1024 ** 2 // 8)  # 100 MB, released before the span ends
+        array[:] = 2.
+        del array
+    with instrumentation.span('after'):
+        pass
+
+    allocate, after = instrumentation.get_spans()
+    assert allocate['peak_rss_mb'] - allocate['rss_start_mb'] > 90
+    assert abs(allocate['rss_delta_mb']) < 50
+    # The peak is the one of the stage, not of the lifetime of the process
+    assert after['peak_rss_mb'] < allocate['peak_rss_mb'] - 90
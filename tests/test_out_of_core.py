@@ -0,0 +1,32 @@
+import gc
+import glob
+import tempfile
+import pytest
+from windml.core.benchmark import generate_synthetic_file
+from windml.machine_learning.out_of_core import build_dmatrix, clear_dmatrix_cache, train_fleet_model
+
+X_LIST = ['Year', 'Month', 'DayOfWeek', 'HourOfDay']
+
+
+@pytest.fixture
+def data_dir(tmp_path):
+    for number, name in enumerate(['R80711', 'R80721']):
+        generate_synthetic_file(tmp_path / f'{name}.csv', 2000, turbine_name=name, seed=number)
+    return tmp_path
+
+
+def test_temporary_pages_are_removed(data_dir):
+    page_dirs = set(glob.glob(f'{tempfile.gettempdir()}/windml_xgb_*'))
+    dmatrix, report = build_dmatrix(str(data_dir), X_LIST, 'P_avg', external_memory=True, use_cache=False)
+    new_dirs = set(glob.glob(f'{tempfile.gettempdir()}/windml_xgb_*')) - page_dirs
+    assert report['rows'] == 4000 and len(new_dirs) == 1
+
+    del dmatrix
+    clear_dmatrix_cache()
+    gc.collect()
+    assert not set(glob.glob(f'{tempfile.gettempdir()}/windml_xgb_*')) & new_dirs
+
+
+def test_empty_validation_range(data_dir):
+    with pytest.raises(ValueError, match='No validation rows'):
+        train_fleet_model(str(data_dir), X_LIST, 'P_avg', split_date='2030-01-01', use_cache=False)
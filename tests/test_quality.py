@@ -0,0 +1,55 @@
+import numpy as np
+import pandas as pd
+import pytest
+from windml.core.quality import QUALITY_FLAGS, check_quality
+
+
+@pytest.fixture
+def turbine_df():
+    """
+    20 records of one turbine on the 10-minute grid, then:
+    - records 3 and 4 removed (short gap, filled),
+    - records 10 to 14 removed (long gap, left missing),
+    - record 6 shifted by 2 minutes (off the grid),
+    - record 8 duplicated first with a missing 'Ws_avg', then with every value.
+    """
+    times = pd.date_range('2017-01-01', periods=20, freq='10min', tz='UTC', name='Date_time')
+    df = pd.DataFrame({'Wind_turbine_name': 'R80711', 'Ws_avg': np.linspace(6., 8., 20),
+                       'P_avg': np.linspace(300., 500., 20)}, index=times)
+    df = df.drop(times[[3, 4, 10, 11, 12, 13, 14]])
+    df = df.rename(index={times[6]: times[6] + pd.Timedelta(minutes=2)})
+    duplicate = df.loc[[times[8]]].assign(Ws_avg=np.nan, P_avg=0.)
+    return pd.concat([df.loc[:times[7]], duplicate, df.loc[times[8]:]])
+
+
+def flags_of(df, *positions):
+    return df['Quality_flags'].to_numpy()[list(positions)]
+
+
+def test_regularization_flags(turbine_df):
+    df, summary = check_quality(turbine_df)
+
+    assert len(df) == 20 and (df.index == pd.date_range('2017-01-01', periods=20, freq='10min', tz='UTC')).all()
+    gap, filled, missing = QUALITY_FLAGS['gap'], QUALITY_FLAGS['filled'], QUALITY_FLAGS['missing']
+    assert (flags_of(df, 3, 4) == gap | filled).all()
+    np.testing.assert_allclose(df['P_avg'].iloc[3:5], np.linspace(300., 500., 20)[3:5])
+    assert (flags_of(df, 10, 11, 12, 13, 14) == gap | missing).all()
+    assert (flags_of(df, 0, 1, 2, 5, 6, 7, 8, 9, 15, 19) == 0).all()
+
+    turbine = summary.loc['R80711']
+    assert (turbine['duplicates'], turbine['off_grid'], turbine['gaps']) == (1, 1, 2)
+    assert (turbine['missing_records'], turbine['filled_records'], turbine['missing']) == (7, 2, 5)
+
+
+@pytest.mark.parametrize('rule, power', [('most_complete', 500. * 8 / 19 + 300. * 11 / 19), ('first', 0.),
+                                         ('last', 500. * 8 / 19 + 300. * 11 / 19)])
+def test_duplicates_rule(turbine_df, rule, power):
+    df, _ = check_quality(turbine_df, rules={'duplicates': rule})
+    assert df['P_avg'].iloc[8] == pytest.approx(power)
+    # The incomplete record is flagged as missing when it is kept
+    assert bool(flags_of(df, 8)[0] & QUALITY_FLAGS['missing']) == (rule == 'first')
+
+
+def test_duplicates_rule_does_not_depend_on_order(turbine_df):
+    reordered = turbine_df.iloc[::-1]  # The complete duplicate comes first
+    pd.testing.assert_frame_equal(check_quality(reordered)[0], check_quality(turbine_df)[0])
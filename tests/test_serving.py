@@ -0,0 +1,29 @@
+import asyncio
+import numpy as np
+import pandas as pd
+import pytest
+from windml.machine_learning.incremental import fit_forecaster
+from windml.machine_learning.serving import PredictionServer
+
+
+@pytest.fixture
+def forecaster():
+    months = pd.date_range('2013-01-01', periods=36, freq='MS')
+    df = pd.DataFrame({'Year': months.year, 'Month': months.month,
+                       'P_avg': 50 + np.random.default_rng(0).normal(size=len(months))})
+    return fit_forecaster(df, 'P_avg', method='ar', lags=2)
+
+
+def test_forecast_cache_is_bounded(forecaster):
+    server = PredictionServer({'ar': forecaster}, cache_size=3, max_forecast_steps=12)
+
+    async def requests():
+        for steps in range(1, 13):
+            await server.forecast('ar', steps)
+        assert len(await server.forecast('ar', 12)) == 12
+        with pytest.raises(ValueError):
+            await server.forecast('ar', 13)
+
+    asyncio.run(requests())
+    assert list(server.caches['ar']) == [('steps', 10), ('steps', 11), ('steps', 12)]
+    assert server.counters['cache_hits'] == 1
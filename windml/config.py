@@ -7,3 +7,4 @@ BASE_DIR = Path(__file__).parent.parent
 DATA_DIR = BASE_DIR / 'data'
 IMAGES_DIR = BASE_DIR / 'images'
 EXAMPLE_FILE = DATA_DIR / 'R80711.csv'
+CACHE_DIR = DATA_DIR / 'cache'
@@ -0,0 +1,234 @@
+import os
+import pandas as pd
+import pyarrow as pa
+from .functions import (DTYPES, DATE_FORMAT, list_csv_files, read_turbine_csv, polish_data, select_time_subset,
+                        _restore_dtypes, _to_timestamp, _with_date_column)
+
+# Every backend implements the same operations on its own frame type:
+# - 'read': list of CSV files, columns -> raw frame
+# - 'polish': raw frame -> frame with the UTC 'Date_time' and the calendar columns of polish_data
+# - 'select': frame, criteria of select_time_subset -> frame
+# - 'to_pandas': frame -> the DataFrame polish_data would return for the same files
+# Frames stay in the backend between the operations, conversion to pandas happens once, at the
+# ML/plot boundary.
+
+
+def _pandas_read(csv_files, columns):
+    frames = [read_turbine_csv(file, columns=columns) for file in csv_files]
+    return frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+
+
+def _pandas_select(df, year=None, month=None, hour=None, start=None, end=None, turbine=None):
+    return select_time_subset(df, year=year, month=month, hour=hour, start=start, end=end, turbine=turbine)
+
+
+def _pandas_time_unit():
+    """Resolution pandas gives to the 'Date_time' index of polish_data (ns in pandas 2, us in pandas 3)."""
+    return pd.to_datetime(['2000-01-01 00:00:00+00:00'], format=DATE_FORMAT, utc=True).unit
+
+
+def _arrow_read(csv_files, columns):
+    import pyarrow.csv as pcsv
+
+    convert_options = pcsv.ConvertOptions(
+        column_types={'Date_time': pa.timestamp('us', tz='UTC'), 'Date_time_nr': pa.int64()},
+        include_columns=columns,
+    )
+    tables = []
+    for file in csv_files:
+        table = pcsv.read_csv(file, convert_options=convert_options)
+        # Empty columns are read as NaN floats by pandas
+        for i, field in enumerate(table.schema):
+            if pa.types.is_null(field.type):
+                table = table.set_column(i, field.name, table.column(i).cast(pa.float64()))
+        tables.append(table)
+    return pa.concat_tables(tables, promote_options='permissive')
+
+
+def _arrow_polish(table):
+    import pyarrow.compute as pc
+
+    date_time = table.column('Date_time')
+    calendar = {
+        'Year': pc.year(date_time),
+        'Month': pc.month(date_time),
+        'DayOfWeek': pc.day_of_week(date_time),  # Monday=0, Sunday=6
+        'HourOfDay': pc.hour(date_time),
+    }
+    for column, values in calendar.items():
+        # pandas returns the calendar fields as int32
+        table = table.append_column(column, values.cast(pa.int32()))
+    return table
+
+
+def _arrow_select(table, year=None, month=None, hour=None, start=None, end=None, turbine=None):
+    import pyarrow.compute as pc
+
+    conditions = []
+    for column, value in (('Year', year), ('Month', month), ('HourOfDay', hour), ('Wind_turbine_name', turbine)):
+        if value is not None:
+            conditions.append(pc.field(column) == value)
+    if start is not None:
+        conditions.append(pc.field('Date_time') >= pa.scalar(_to_timestamp(start, 'UTC'), pa.timestamp('us', 'UTC')))
+    if end is not None:
+        conditions.append(pc.field('Date_time') < pa.scalar(_to_timestamp(end, 'UTC'), pa.timestamp('us', 'UTC')))
+    if not conditions:
+        return table
+
+    expression = conditions[0]
+    for condition in conditions[1:]:
+        expression = expression & condition
+    return table.filter(expression)
+
+
+def _arrow_to_pandas(table):
+    df = _restore_dtypes(table.to_pandas(split_blocks=True).set_index('Date_time'))
+    df.index = df.index.as_unit(_pandas_time_unit())
+    return df
+
+
+def _polars_read(csv_files, columns):
+    import polars as pl
+
+    frames = []
+    for file in csv_files:
+        # The whole file is scanned to infer the column types, as pandas does
+        frame = pl.scan_csv(file, infer_schema_length=None)
+        # Empty columns are read as strings by polars and as NaN floats by pandas. They are cast per file,
+        # before concatenating, since a string and a float column would be merged into a string column
+        empty = [name for name, dtype in frame.collect_schema().items()
+                 if dtype in (pl.String, pl.Null) and name not in DTYPES]
+        frames.append(frame.with_columns(pl.col(empty).cast(pl.Float64)) if empty else frame)
+    frame = pl.concat(frames, how='vertical_relaxed')
+    return frame.select(columns) if columns is not None else frame
+
+
+def _polars_polish(frame):
+    import polars as pl
+
+    frame = frame.with_columns(
+        pl.col('Date_time').str.to_datetime(DATE_FORMAT, time_unit='us', time_zone='UTC'))
+    date_time = pl.col('Date_time').dt
+    return frame.with_columns(
+        date_time.year().cast(pl.Int32).alias('Year'),
+        date_time.month().cast(pl.Int32).alias('Month'),
+        (date_time.weekday() - 1).cast(pl.Int32).alias('DayOfWeek'),  # polars counts from Monday=1
+        date_time.hour().cast(pl.Int32).alias('HourOfDay'),
+    )
+
+
+def _polars_select(frame, year=None, month=None, hour=None, start=None, end=None, turbine=None):
+    import polars as pl
+
+    conditions = [pl.col(column) == value
+                  for column, value in (('Year', year), ('Month', month), ('HourOfDay', hour),
+                                        ('Wind_turbine_name', turbine))
+                  if value is not None]
+    if start is not None:
+        conditions.append(pl.col('Date_time') >= _to_timestamp(start, 'UTC').to_pydatetime())
+    if end is not None:
+        conditions.append(pl.col('Date_time') < _to_timestamp(end, 'UTC').to_pydatetime())
+    return frame.filter(pl.all_horizontal(conditions)) if conditions else frame
+
+
+def _polars_to_pandas(frame):
+    import polars as pl
+
+    if isinstance(frame, pl.LazyFrame):
+        frame = frame.collect()
+    return _arrow_to_pandas(frame.to_arrow())
+
+
+BACKENDS = {
+    'pandas': {'read': _pandas_read, 'polish': polish_data, 'select': _pandas_select, 'to_pandas': lambda df: df},
+    'arrow': {'read': _arrow_read, 'polish': _arrow_polish, 'select': _arrow_select, 'to_pandas': _arrow_to_pandas},
+    'polars': {'read': _polars_read, 'polish': _polars_polish, 'select': _polars_select,
+               'to_pandas': _polars_to_pandas},
+}
+
+
+def _backend(name):
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown backend '{name}', use one of {', '.join(BACKENDS)}.")
+    return BACKENDS[name]
+
+
+def load(source, backend='pandas', columns=None):
+    """
+    Reads and polishes turbine CSV files with a dataframe backend, without converting the result to pandas.
+
+    The backends return their own frame type: a pandas DataFrame indexed by datetime ('pandas'), a
+    pyarrow Table read and processed by the multithreaded Arrow CSV reader and compute kernels ('arrow'),
+    or a polars LazyFrame, whose filters and column selections are optimized and run in parallel when
+    it is collected ('polars', requires the optional polars package). In the Arrow and polars frames the
+    UTC datetime stays in the 'Date_time' column.
+
+    Parameters:
+    - source (str): A turbine CSV file, or a folder of turbine CSV files (see list_csv_files).
+    - backend (str): 'pandas', 'arrow' or 'polars'. Default is 'pandas'.
+    - columns (list, optional): Subset of columns to load. 'Date_time' is always loaded.
+
+    Returns:
+    - The polished frame of the backend.
+
+    Example:
+    >>> table = load('path/to/data', backend='arrow', columns=['Wind_turbine_name', 'Ws_avg', 'P_avg'])
+    >>> df = to_pandas(select_subset(table, backend='arrow', year=2017, turbine='R80711'), backend='arrow')
+    """
+
+    csv_files = [source] if os.path.isfile(source) else list_csv_files(source)
+    if not csv_files:
+        raise FileNotFoundError(f'No turbine CSV files found in {source}.')
+
+    operations = _backend(backend)
+    return operations['polish'](operations['read'](csv_files, _with_date_column(columns)))
+
+
+def polish(frame, backend='pandas'):
+    """
+    Applies polish_data to a raw frame of a backend: parses 'Date_time' to UTC and adds the 'Year', 'Month',
+    'DayOfWeek' and 'HourOfDay' columns.
+
+    Parameters:
+    - frame: A raw frame of the backend, with the columns of the turbine CSV files.
+    - backend (str): 'pandas', 'arrow' or 'polars'. Default is 'pandas'.
+
+    Returns:
+    - The polished frame of the backend.
+    """
+    return _backend(backend)['polish'](frame)
+
+
+def select_subset(frame, backend='pandas', year=None, month=None, hour=None, start=None, end=None, turbine=None):
+    """
+    Selects rows of a polished frame by year, month and hour (in UTC), date range and turbine, with the
+    semantics of select_time_subset.
+
+    Parameters:
+    - frame: A polished frame of the backend (see load).
+    - backend (str): 'pandas', 'arrow' or 'polars'. Default is 'pandas'.
+    - year, month, hour (int, optional): Calendar values to select.
+    - start (optional): First date to select (inclusive), as a string or Timestamp.
+    - end (optional): Last date to select (exclusive), as a string or Timestamp.
+    - turbine (str, optional): Name of the wind turbine to select.
+
+    Returns:
+    - The selected frame of the backend.
+    """
+    return _backend(backend)['select'](frame, year=year, month=month, hour=hour, start=start, end=end,
+                                       turbine=turbine)
+
+
+def to_pandas(frame, backend='pandas'):
+    """
+    Converts a polished frame of a backend to pandas. The result is identical to the one of the pandas
+    backend (polish_data): same datetime index, column order and dtypes.
+
+    Parameters:
+    - frame: A polished frame of the backend.
+    - backend (str): 'pandas', 'arrow' or 'polars'. Default is 'pandas'.
+
+    Returns:
+    - DataFrame: The frame indexed by datetime, ready for the ML and plotting functions.
+    """
+    return _backend(backend)['to_pandas'](frame)
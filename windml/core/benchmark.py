@@ -0,0 +1,328 @@
+"""
+Reproducible benchmark of the dataframe libraries on ENGIE-shaped turbine CSV files.
+
+Every library reads and concatenates the same files into a fully materialized, in-memory DataFrame.
+Each measurement is repeated after warm-up runs; wall time is taken around the operation only, and
+the peak RSS (including child processes, e.g. dask or modin workers) is sampled while it runs.
+
+Usage:
+    python -m windml.core.benchmark --data-dir data --output benchmark.json
+    python -m windml.core.benchmark --synthetic-files 1 2 4 --synthetic-rows 52560 --output scaling.csv
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+import importlib.util
+import tempfile
+import numpy as np
+import pandas as pd
+from .functions import DTYPES, ENGIE_VARIABLES, SIGNAL_SUFFIXES, list_csv_files
+from .instrumentation import sample_rss
+
+LIBRARIES = ['pandas', 'dask', 'vaex', 'modin']
+
+# Modules needed by every library, installed with the optional 'benchmark' dependencies
+REQUIREMENTS = {
+    'pandas': [],
+    'dask': ['dask.dataframe', 'distributed'],
+    'vaex': ['vaex'],
+    'modin': ['modin'],
+}
+
+
+def generate_synthetic_file(filename, n_rows, turbine_name='R80000', start='2013-01-01', seed=0):
+    """
+    Writes a synthetic turbine CSV file with the columns and the format of the ENGIE files:
+    'Wind_turbine_name', 'Date_time' (10-minute steps), 'Date_time_nr' and the '_avg', '_min', '_max'
+    and '_std' columns of every variable in ENGIE_VARIABLES.
+
+    Parameters:
+    - filename (str): The path of the CSV file to write.
+    - n_rows (int): Number of 10-minute records.
+    - turbine_name (str): Value of the 'Wind_turbine_name' column. Default is 'R80000'.
+    - start (str): First timestamp (UTC). Default is '2013-01-01'.
+    - seed (int): Seed of the random generator. Default is 0.
+    """
+
+    rng = np.random.default_rng(seed)
+    date_time = pd.date_range(start, periods=n_rows, freq='10min', tz='UTC')
+
+    data = {
+        'Wind_turbine_name': turbine_name,
+        'Date_time': date_time.strftime('%Y-%m-%d %H:%M:%S+00:00'),
+        'Date_time_nr': date_time.asi8 // 10 ** 9,
+    }
+
+    wind_speed = 8 * rng.weibull(2., n_rows)
+    for variable in ENGIE_VARIABLES:
+        if variable.startswith('Ws'):
+            average = wind_speed
+        elif variable == 'P':
+            average = np.clip(2050 * (wind_speed / 13) ** 3, 0, 2050)
+        elif variable.startswith(('Wa', 'Ya', 'Na')):
+            average = rng.uniform(0, 360, n_rows)
+        else:
+            average = rng.normal(20, 5, n_rows)
+        spread = np.abs(rng.normal(0, 1, n_rows))
+        for suffix, values in zip(SIGNAL_SUFFIXES, (average, average - spread, average + spread, spread)):
+            data[f'{variable}{suffix}'] = values
+
+    pd.DataFrame(data).to_csv(filename, index=False, float_format='%.2f')
+
+
+def generate_synthetic_dataset(folder_path, n_files=4, n_rows=52560, seed=0):
+    """
+    Writes n_files synthetic turbine CSV files (see generate_synthetic_file) to a folder.
+    The default of 52560 rows is one year of 10-minute records, about the size of the ENGIE files.
+
+    Parameters:
+    - folder_path (str): The folder to write the files to. It is created if needed.
+    - n_files (int): Number of turbine files. Default is 4.
+    - n_rows (int): Number of rows per file. Default is 52560.
+    - seed (int): Base seed of the random generator. Default is 0.
+
+    Returns:
+    - list: The paths of the written files.
+    """
+
+    os.makedirs(folder_path, exist_ok=True)
+    files = []
+    for number in range(n_files):
+        filename = os.path.join(folder_path, f'R{80000 + number}.csv')
+        generate_synthetic_file(filename, n_rows, turbine_name=f'R{80000 + number}', seed=seed + number)
+        files.append(filename)
+    return files
+
+
+def _read_pandas(csv_files, context):
+    return pd.concat([pd.read_csv(file, dtype=DTYPES) for file in csv_files])
+
+
+def _read_dask(csv_files, context):
+    import dask.dataframe as dd
+    return dd.concat([dd.read_csv(file, dtype=DTYPES) for file in csv_files]).compute()
+
+
+def _read_vaex(csv_files, context):
+    import vaex
+    # vaex.open_many is lazy, from_csv reads the data into memory like the other libraries
+    return vaex.concat([vaex.from_csv(file, dtype=DTYPES) for file in csv_files])
+
+
+def _read_modin(csv_files, context):
+    import modin.pandas as mpd
+    return mpd.concat([mpd.read_csv(file, dtype=DTYPES) for file in csv_files])
+
+
+READERS = {'pandas': _read_pandas, 'dask': _read_dask, 'vaex': _read_vaex, 'modin': _read_modin}
+
+
+def _check_requirements(library):
+    """Raises an ImportError naming the missing modules of a library, before anything is measured."""
+    missing = [module for module in REQUIREMENTS[library] if importlib.util.find_spec(module.split('.')[0]) is None]
+    if missing:
+        raise ImportError(f"Benchmarking {library} requires {', '.join(missing)}. "
+                          f"Install the optional dependencies with `poetry install -E benchmark`.")
+
+
+def _setup(library):
+    """Starts the resources a library needs (outside of the timed region) and returns them."""
+    if library == 'dask':
+        from distributed import Client
+        return {'client': Client()}
+    return {}
+
+
+def _teardown(library, context):
+    """Releases the resources started by _setup."""
+    if 'client' in context:
+        context['client'].close()
+
+
+def _timed_read(reader, csv_files, context):
+    """Runs a reader and returns the wall time and the number of rows of the materialized result."""
+    start_time = time.perf_counter()
+    df = reader(csv_files, context)
+    n_rows = len(df)
+    end_time = time.perf_counter()
+    return end_time - start_time, n_rows
+
+
+def benchmark_library(library, csv_files, repeats=3, warmup=1, interval=0.01):
+    """
+    Benchmarks one library on a list of CSV files.
+
+    Parameters:
+    - library (str): One of 'pandas', 'dask', 'vaex', 'modin'.
+    - csv_files (list): The CSV files to read and concatenate.
+    - repeats (int): Number of measured runs. Default is 3.
+    - warmup (int): Number of runs executed before measuring. Default is 1.
+    - interval (float): Sampling interval of the RSS in seconds. Default is 0.01.
+
+    Returns:
+    - list: One dictionary per measured run, with the keys 'library', 'repeat', 'n_files', 'n_rows',
+            'size_mb', 'time_s', 'baseline_rss_mb' and 'peak_rss_mb'.
+    """
+    _check_requirements(library)
+
+    reader = READERS[library]
+    size_mb = sum(os.path.getsize(file) for file in csv_files) / (1024 * 1024)
+
+    context = _setup(library)
+    try:
+        for _ in range(warmup):
+            _timed_read(reader, csv_files, context)
+
+        records = []
+        for repeat in range(repeats):
+            with sample_rss(interval=interval) as memory:
+                elapsed, n_rows = _timed_read(reader, csv_files, context)
+            records.append({
+                'library': library,
+                'repeat': repeat,
+                'n_files': len(csv_files),
+                'n_rows': n_rows,
+                'size_mb': round(size_mb, 2),
+                'time_s': round(elapsed, 4),
+                'baseline_rss_mb': round(memory['start_mb'], 2),
+                'peak_rss_mb': round(memory['peak_mb'], 2),
+            })
+    finally:
+        _teardown(library, context)
+
+    return records
+
+
+def run_benchmark(folder_path, libraries=None, repeats=3, warmup=1):
+    """
+    Benchmarks several libraries on the turbine CSV files of a folder.
+
+    Parameters:
+    - folder_path (str): The path to the directory containing the CSV files. The files should
+                         start with 'R' and have a '.csv' extension.
+    - libraries (list, optional): Libraries to benchmark. Default is LIBRARIES.
+    - repeats (int): Number of measured runs per library. Default is 3.
+    - warmup (int): Number of runs executed before measuring. Default is 1.
+
+    Returns:
+    - list: The records of benchmark_library for every library.
+    """
+
+    csv_files = sorted(list_csv_files(folder_path))
+    if not csv_files:
+        raise FileNotFoundError(f'No turbine CSV files found in {folder_path}.')
+
+    libraries = libraries or LIBRARIES
+    for library in libraries:
+        _check_requirements(library)
+
+    records = []
+    for library in libraries:
+        records.extend(benchmark_library(library, csv_files, repeats=repeats, warmup=warmup))
+    return records
+
+
+def run_scaling_benchmark(file_counts=(1, 2, 4), row_counts=(52560,), libraries=None, repeats=3, warmup=1,
+                          work_dir=None):
+    """
+    Benchmarks the libraries on synthetic datasets of growing size, by number of files and rows per file.
+
+    Parameters:
+    - file_counts (tuple): Numbers of turbine files. Default is (1, 2, 4).
+    - row_counts (tuple): Numbers of rows per file. Default is (52560,).
+    - libraries (list, optional): Libraries to benchmark. Default is LIBRARIES.
+    - repeats (int): Number of measured runs. Default is 3.
+    - warmup (int): Number of runs executed before measuring. Default is 1.
+    - work_dir (str, optional): Folder for the synthetic files. Default is a temporary folder.
+
+    Returns:
+    - list: The records of benchmark_library for every library and dataset size.
+    """
+
+    records = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        for n_rows in row_counts:
+            for n_files in file_counts:
+                folder_path = os.path.join(tmp_dir, f'{n_files}x{n_rows}')
+                generate_synthetic_dataset(folder_path, n_files=n_files, n_rows=n_rows)
+                records.extend(run_benchmark(folder_path, libraries=libraries, repeats=repeats, warmup=warmup))
+    return records
+
+
+def summarize(records):
+    """
+    Summarizes benchmark records: median time and maximum peak RSS per library and dataset size.
+
+    Parameters:
+    - records (list): Records returned by run_benchmark or run_scaling_benchmark.
+
+    Returns:
+    - DataFrame: One row per (library, n_files, n_rows).
+    """
+    df = pd.DataFrame(records)
+    return df.groupby(['library', 'n_files', 'n_rows'], sort=False).agg(
+        size_mb=('size_mb', 'first'),
+        time_s=('time_s', 'median'),
+        peak_rss_mb=('peak_rss_mb', 'max'),
+    ).reset_index()
+
+
+def save_results(records, filename):
+    """
+    Saves benchmark records with the machine details, as JSON or CSV depending on the file extension.
+
+    Parameters:
+    - records (list): Records returned by run_benchmark or run_scaling_benchmark.
+    - filename (str): Output file, ending with '.json' or '.csv'.
+    """
+
+    if str(filename).endswith('.csv'):
+        pd.DataFrame(records).to_csv(filename, index=False)
+        return
+
+    output = {
+        'machine': {
+            'platform': platform.platform(),
+            'processor': platform.processor(),
+            'cpu_count': os.cpu_count(),
+            'python': platform.python_version(),
+        },
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'records': records,
+    }
+    with open(filename, 'w') as f:
+        json.dump(output, f, indent=2)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark dataframe libraries on turbine CSV files.')
+    parser.add_argument('--data-dir', help='Folder containing the turbine CSV files.')
+    parser.add_argument('--synthetic-files', type=int, nargs='+',
+                        help='Benchmark synthetic datasets with these numbers of files instead of --data-dir.')
+    parser.add_argument('--synthetic-rows', type=int, nargs='+', default=[52560],
+                        help='Numbers of rows per synthetic file. Default is 52560 (one year).')
+    parser.add_argument('--libraries', nargs='+', choices=LIBRARIES, default=LIBRARIES)
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--warmup', type=int, default=1)
+    parser.add_argument('--output', help='Output file (.json or .csv).')
+    args = parser.parse_args(argv)
+
+    if args.synthetic_files:
+        records = run_scaling_benchmark(args.synthetic_files, args.synthetic_rows, libraries=args.libraries,
+                                        repeats=args.repeats, warmup=args.warmup)
+    elif args.data_dir:
+        records = run_benchmark(args.data_dir, libraries=args.libraries, repeats=args.repeats, warmup=args.warmup)
+    else:
+        parser.error('one of --data-dir or --synthetic-files is required')
+
+    print(summarize(records).to_string(index=False))
+    if args.output:
+        save_results(records, args.output)
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,129 @@
+import os
+import json
+import hashlib
+from pathlib import Path
+import pandas as pd
+from ..config import CACHE_DIR
+
+
+def cache_key(filename, dtypes):
+    """
+    Builds the cache key of a CSV file from its resolved path, modification time, size and dtype spec.
+
+    Any change to the source file (rewritten, appended, touched) or to the requested dtypes produces
+    a different key, so a stale cache entry is never served.
+
+    Parameters:
+    - filename (str or Path): The path to the source CSV file.
+    - dtypes (dict): The dtype specification used to parse the CSV file.
+
+    Returns:
+    - str: A hexadecimal digest identifying the (file, dtypes) pair.
+    """
+
+    path = Path(filename).resolve()
+    stat = path.stat()
+    spec = {
+        'path': str(path),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'dtypes': {column: str(dtype) for column, dtype in sorted(dtypes.items())},
+    }
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:16]
+
+
+def cache_path(filename, dtypes, cache_dir=None):
+    """
+    Returns the location of the Parquet cache file of a CSV file.
+
+    The file name is made of the CSV stem, a digest of the source path and the cache key,
+    e.g. 'R80711-1a2b3c4d-0123456789abcdef.parquet'.
+
+    Parameters:
+    - filename (str or Path): The path to the source CSV file.
+    - dtypes (dict): The dtype specification used to parse the CSV file.
+    - cache_dir (str or Path, optional): Folder holding the cache files. Default is config.CACHE_DIR.
+
+    Returns:
+    - Path: The path of the cache file (which may not exist yet).
+    """
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else CACHE_DIR
+    path = Path(filename).resolve()
+    path_digest = hashlib.sha1(str(path).encode()).hexdigest()[:8]
+    return cache_dir / f'{path.stem}-{path_digest}-{cache_key(path, dtypes)}.parquet'
+
+
+def write_cache(df, filename, dtypes, cache_dir=None, compression='zstd'):
+    """
+    Writes a parsed DataFrame to the Parquet cache and removes older cache entries of the same source file.
+
+    The file is first written to a temporary name and then atomically renamed, so concurrent readers
+    never see a partially written cache entry.
+
+    Parameters:
+    - df (DataFrame): The parsed content of the CSV file.
+    - filename (str or Path): The path to the source CSV file.
+    - dtypes (dict): The dtype specification used to parse the CSV file.
+    - cache_dir (str or Path, optional): Folder holding the cache files. Default is config.CACHE_DIR.
+    - compression (str): Parquet compression codec. Default is 'zstd'.
+
+    Returns:
+    - Path: The path of the written cache file.
+    """
+
+    target = cache_path(filename, dtypes, cache_dir)
+    target.parent.mkdir(parents=True, exist_ok=True)
+
+    # Drop entries of the same source built from an older version of the file or other dtypes
+    prefix = target.name.rsplit('-', 1)[0]
+    for stale in target.parent.glob(f'{prefix}-*.parquet'):
+        if stale != target:
+            stale.unlink(missing_ok=True)
+
+    tmp = target.with_name(f'{target.name}.{os.getpid()}.tmp')
+    df.to_parquet(tmp, engine='pyarrow', compression=compression, index=False)
+    os.replace(tmp, target)
+
+    return target
+
+
+def read_cache(filename, dtypes, cache_dir=None, columns=None, memory_map=False):
+    """
+    Reads a CSV file from the Parquet cache.
+
+    Parameters:
+    - filename (str or Path): The path to the source CSV file.
+    - dtypes (dict): The dtype specification used to parse the CSV file.
+    - cache_dir (str or Path, optional): Folder holding the cache files. Default is config.CACHE_DIR.
+    - columns (list, optional): Subset of columns to read. Default is None (all columns).
+    - memory_map (bool): If True, the cache file is memory-mapped instead of read into a buffer.
+
+    Returns:
+    - DataFrame or None: The cached content, or None if there is no valid cache entry.
+    """
+
+    target = cache_path(filename, dtypes, cache_dir)
+    if not target.exists():
+        return None
+
+    return pd.read_parquet(target, engine='pyarrow', columns=columns, memory_map=memory_map)
+
+
+def clear_cache(cache_dir=None):
+    """
+    Removes every Parquet cache file from the cache folder.
+
+    Parameters:
+    - cache_dir (str or Path, optional): Folder holding the cache files. Default is config.CACHE_DIR.
+
+    Returns:
+    - int: The number of removed files.
+    """
+
+    cache_dir = Path(cache_dir) if cache_dir is not None else CACHE_DIR
+    removed = 0
+    for cached in cache_dir.glob('*.parquet'):
+        cached.unlink(missing_ok=True)
+        removed += 1
+    return removed
@@ -0,0 +1,233 @@
+import json
+import hashlib
+import shutil
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from ..config import DATA_DIR
+
+FEATURE_STORE_DIR = DATA_DIR / 'features'
+
+# Windows are numbers of 10-minute records: 6 = 1 hour, 36 = 6 hours, 144 = 1 day
+DEFAULT_FEATURE_SPEC = {
+    'lags': {'Ws_avg': [1, 6], 'P_avg': [1, 6]},
+    'rolling_mean': {'Ws_avg': [6, 36], 'P_avg': [6, 36]},
+    'rolling_std': {'Ws_avg': [6, 36]},
+    'calendar': True,
+}
+
+
+def feature_spec_hash(spec):
+    """
+    Returns a short digest identifying a feature specification, used to key the feature store.
+
+    Parameters:
+    - spec (dict): Feature specification, see DEFAULT_FEATURE_SPEC.
+
+    Returns:
+    - str: A 12 characters hexadecimal digest.
+    """
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode()).hexdigest()[:12]
+
+
+def _source_columns(spec):
+    """Raw columns needed to compute a feature specification."""
+    columns = []
+    for kind in ['lags', 'rolling_mean', 'rolling_std']:
+        for column in spec.get(kind, {}):
+            if column not in columns:
+                columns.append(column)
+    return columns
+
+
+def _context_length(spec):
+    """Number of previous records needed to compute the features of a new record."""
+    lengths = [lag for lags in spec.get('lags', {}).values() for lag in lags]
+    lengths += [window - 1 for kind in ['rolling_mean', 'rolling_std'] for windows in spec.get(kind, {}).values()
+                for window in windows]
+    return max(lengths, default=0)
+
+
+def compute_features(df, spec=DEFAULT_FEATURE_SPEC, group_col='Wind_turbine_name'):
+    """
+    Computes lagged values, rolling means and rolling standard deviations per turbine, plus the
+    calendar columns of polish_data.
+
+    The DataFrame is sorted by turbine and time, then every feature is computed on the whole column
+    at once and the values whose window reaches into the previous turbine are set to NaN. This avoids
+    a Python-level loop over the turbines (groupby().rolling) and keeps the cost linear in the rows.
+    Windows are counted in records, not in time, and only full windows produce a value.
+
+    Parameters:
+    - df (DataFrame): A DataFrame processed by polish_data, with the columns used by the specification.
+    - spec (dict): Feature specification, see DEFAULT_FEATURE_SPEC.
+    - group_col (str): Column identifying the turbines. Default is 'Wind_turbine_name'.
+
+    Returns:
+    - DataFrame: Indexed by datetime and sorted by turbine and time, with group_col, the source columns,
+                 the '<column>_lag<n>', '<column>_rmean<n>', '<column>_rstd<n>' features and the calendar columns.
+    """
+
+    source = df[[group_col] + _source_columns(spec)]
+    # Sorted on integers: the int64 epoch of the index and the codes of the turbines, in the order of their names
+    # (a tz-aware index converts to an array of Timestamp objects, which is slow to sort)
+    turbine_codes, _ = pd.factorize(source[group_col].to_numpy(), sort=True)
+    order = np.lexsort((source.index.asi8, turbine_codes))
+    source = source.iloc[order]
+
+    # Position of every row within its turbine, to mask windows crossing a turbine boundary
+    position = source.groupby(group_col, observed=True, sort=False).cumcount().to_numpy()
+
+    features = {}
+    for column, lags in spec.get('lags', {}).items():
+        for lag in lags:
+            features[f'{column}_lag{lag}'] = source[column].shift(lag).where(position >= lag)
+    for column, windows in spec.get('rolling_mean', {}).items():
+        for window in windows:
+            rolling = source[column].rolling(window)
+            features[f'{column}_rmean{window}'] = rolling.mean().where(position >= window - 1)
+    for column, windows in spec.get('rolling_std', {}).items():
+        for window in windows:
+            rolling = source[column].rolling(window)
+            features[f'{column}_rstd{window}'] = rolling.std().where(position >= window - 1)
+
+    result = pd.concat([source, pd.DataFrame(features, index=source.index)], axis=1)
+
+    if spec.get('calendar', False):
+        result['Year'] = result.index.year
+        result['Month'] = result.index.month
+        result['DayOfWeek'] = result.index.dayofweek
+        result['HourOfDay'] = result.index.hour
+
+    return result
+
+
+def _spec_dir(spec, store_dir):
+    """Folder of a feature specification in the store, created with its spec.json if needed."""
+    store_dir = Path(store_dir) if store_dir is not None else FEATURE_STORE_DIR
+    spec_dir = store_dir / feature_spec_hash(spec)
+    spec_dir.mkdir(parents=True, exist_ok=True)
+    spec_file = spec_dir / 'spec.json'
+    if not spec_file.exists():
+        with open(spec_file, 'w') as f:
+            json.dump(spec, f, indent=2, sort_keys=True)
+    return spec_dir
+
+
+def _part_files(turbine_dir):
+    return sorted(turbine_dir.glob('part-*.parquet'))
+
+
+def _write_part(features, turbine_dir):
+    """Writes a new part file after the existing ones."""
+    turbine_dir.mkdir(parents=True, exist_ok=True)
+    parts = _part_files(turbine_dir)
+    number = int(parts[-1].stem.split('-')[1]) + 1 if parts else 0
+    features.to_parquet(turbine_dir / f'part-{number:05d}.parquet', engine='pyarrow', compression='zstd')
+
+
+def build_feature_store(df, spec=DEFAULT_FEATURE_SPEC, store_dir=None, group_col='Wind_turbine_name'):
+    """
+    Computes the features of a DataFrame (see compute_features) and stores them as Parquet files,
+    one folder per turbine under a folder named after the hash of the specification. Existing
+    features of the same turbines and specification are replaced.
+
+    Parameters:
+    - df (DataFrame): A DataFrame processed by polish_data, e.g. the output of load_all.
+    - spec (dict): Feature specification, see DEFAULT_FEATURE_SPEC.
+    - store_dir (str, optional): Root folder of the store. Default is FEATURE_STORE_DIR.
+    - group_col (str): Column identifying the turbines. Default is 'Wind_turbine_name'.
+
+    Returns:
+    - Path: The folder of the specification in the store.
+    """
+
+    spec_dir = _spec_dir(spec, store_dir)
+    features = compute_features(df, spec, group_col=group_col)
+    for turbine, turbine_features in features.groupby(group_col, observed=True, sort=False):
+        turbine_dir = spec_dir / str(turbine)
+        shutil.rmtree(turbine_dir, ignore_errors=True)
+        _write_part(turbine_features, turbine_dir)
+    return spec_dir
+
+
+def update_feature_store(new_df, spec=DEFAULT_FEATURE_SPEC, store_dir=None, group_col='Wind_turbine_name'):
+    """
+    Appends the features of new rows to the store. Only the last records of each turbine needed by the
+    lags and rolling windows are read back from the store, and the new features are written as a new
+    part file, so the cost depends on the new rows only. Rows not newer than the last stored record
+    of their turbine are ignored.
+
+    Parameters:
+    - new_df (DataFrame): The new rows, processed by polish_data (e.g. from read_new_rows).
+    - spec (dict): Feature specification, see DEFAULT_FEATURE_SPEC.
+    - store_dir (str, optional): Root folder of the store. Default is FEATURE_STORE_DIR.
+    - group_col (str): Column identifying the turbines. Default is 'Wind_turbine_name'.
+
+    Returns:
+    - int: Number of rows appended to the store.
+    """
+
+    spec_dir = _spec_dir(spec, store_dir)
+    context_length = _context_length(spec)
+    columns = [group_col] + _source_columns(spec)
+
+    appended = 0
+    for turbine, turbine_df in new_df.groupby(group_col, observed=True, sort=False):
+        turbine_dir = spec_dir / str(turbine)
+
+        # Read the stored records backwards, part by part, until the context is complete
+        context = []
+        n_context = 0
+        for part in reversed(_part_files(turbine_dir)):
+            if n_context > context_length:
+                break
+            stored = pd.read_parquet(part, engine='pyarrow', columns=columns)
+            context.insert(0, stored)
+            n_context += len(stored)
+        context = pd.concat(context).iloc[-(context_length + 1):] if context else None
+
+        new_rows = turbine_df[columns]
+        if context is not None:
+            new_rows = new_rows[new_rows.index > context.index.max()]
+            new_rows = pd.concat([context.astype(new_rows.dtypes.to_dict()), new_rows])
+        features = compute_features(new_rows, spec, group_col=group_col)
+
+        if context is not None:
+            features = features.iloc[len(context):]
+        if len(features):
+            _write_part(features, turbine_dir)
+            appended += len(features)
+
+    return appended
+
+
+def load_features(spec=DEFAULT_FEATURE_SPEC, store_dir=None, turbines=None, columns=None):
+    """
+    Reads features from the store, ready to be used as the df of the regression and forecasting
+    functions (the calendar columns of polish_data are included when the specification has them).
+
+    Parameters:
+    - spec (dict): Feature specification, see DEFAULT_FEATURE_SPEC.
+    - store_dir (str, optional): Root folder of the store. Default is FEATURE_STORE_DIR.
+    - turbines (list, optional): Turbines to read. Default is None (all turbines in the store).
+    - columns (list, optional): Columns to read. Default is None (all columns).
+
+    Returns:
+    - DataFrame: The features indexed by datetime, sorted by turbine and time.
+
+    Example:
+    >>> build_feature_store(load_all('path/to/data'))
+    >>> df = load_features(turbines=['R80711'])
+    >>> lc = learning_curve_with_CV(df.dropna(), ['Ws_avg', 'Ws_avg_rmean6', 'HourOfDay'], 'P_avg', model, grid)
+    """
+
+    spec_dir = (Path(store_dir) if store_dir is not None else FEATURE_STORE_DIR) / feature_spec_hash(spec)
+    if turbines is None:
+        turbines = sorted(path.name for path in spec_dir.iterdir() if path.is_dir())
+
+    frames = [pd.read_parquet(part, engine='pyarrow', columns=columns)
+              for turbine in turbines for part in _part_files(spec_dir / str(turbine))]
+    if not frames:
+        raise FileNotFoundError(f'No features found in {spec_dir}.')
+    return pd.concat(frames)
@@ -1,27 +1,117 @@
+import io
 import os
-import time
-from memory_profiler import memory_usage
+import logging
+import warnings
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
 import pandas as pd
-import dask.dataframe as dd
-import vaex
-import modin.pandas as mpd
-
-def select_time_subset(read_df, year=None, month=None, hour=None, date_column='Date_time'):
+from .cache import read_cache, write_cache
+from .instrumentation import span, is_enabled
+
+logger = logging.getLogger(__name__)
+
+DTYPES = {'Date_time': 'object', 'Date_time_nr': 'int64', 'Wind_turbine_name': 'object'}
+DATE_FORMAT = '%Y-%m-%d %H:%M:%S%z'
+CALENDAR_COLUMNS = ['Year', 'Month', 'DayOfWeek', 'HourOfDay']
+
+# Variables of the ENGIE SCADA files, each one comes with '_avg', '_min', '_max' and '_std' columns
+ENGIE_VARIABLES = ['Ba', 'Cm', 'Cosphi', 'Db1t', 'Db2t', 'DCs', 'Ds', 'Dst', 'Gb1t', 'Gb2t', 'Git', 'Gost',
+                   'Na_c', 'Nf', 'Nu', 'Ot', 'P', 'Pas', 'Q', 'Rbt', 'Rm', 'Rs', 'Rt', 'S', 'Va', 'Va1', 'Va2',
+                   'Wa', 'Wa_c', 'Ws', 'Ws1', 'Ws2', 'Ya', 'Yt']
+SIGNAL_SUFFIXES = ('_avg', '_min', '_max', '_std')
+
+# Compact schema: float32 signals (sensor resolution is far below float32 precision),
+# categorical turbine names and small integer calendar columns
+COMPACT_DTYPES = {
+    'Wind_turbine_name': 'category',
+    **{f'{variable}{suffix}': 'float32' for variable in ENGIE_VARIABLES for suffix in SIGNAL_SUFFIXES},
+    'Year': 'int16',
+    'Month': 'int8',
+    'DayOfWeek': 'int8',
+    'HourOfDay': 'int8',
+}
+
+def select_time_subset(read_df, year=None, month=None, hour=None, date_column='Date_time',
+                       start=None, end=None, turbine=None):
     """
-    Selects a subset of a DataFrame based on year, month, or hour.
+    Selects a subset of a DataFrame based on year, month, hour, date range or turbine.
+
+    On DataFrames processed by polish_data, the selection uses the datetime index: when the index is
+    sorted (see sort_time_index and index_by_turbine), year, month and date ranges are resolved by binary
+    search and the result is a positional slice of the original DataFrame, not a copy. Hour filters, and
+    month filters without a year, use the precomputed 'HourOfDay' and 'Month' columns. On raw DataFrames
+    the datetime column is scanned instead.
 
     Parameters:
-    - read_df: DataFrame containing datetime values.
+    - read_df: DataFrame containing datetime values, either as index or in date_column.
     - year: Integer representing the year (e.g., 2022) to select. Default is None.
     - month: Integer representing the month (1-12) to select. Default is None.
     - hour: Integer representing the hour (0-23) to select. Default is None.
-    - date_column: Name of the column containing the datetime values. Default is 'Date'.
+    - date_column: Name of the column containing the datetime values, if any. Default is 'Date_time'.
+    - start: First date to select (inclusive), as a string or Timestamp. Default is None.
+    - end: Last date to select (exclusive), as a string or Timestamp. Default is None.
+    - turbine: Name of the wind turbine to select. Default is None.
 
     Returns:
     - DataFrame: Subset of the original DataFrame based on the provided criteria.
+
+    Example:
+    >>> df = index_by_turbine(load_all('path/to/data'))
+    >>> january = select_time_subset(df, year=2017, month=1, turbine='R80711')
     """
 
-    subset = read_df.copy()
+    if date_column in read_df.columns:
+        return _select_by_column(read_df, year, month, hour, date_column, start, end, turbine)
+
+    index = read_df.index
+    by_turbine = isinstance(index, pd.MultiIndex)
+    tz = index.levels[-1].tz if by_turbine else index.tz
+
+    # Without a year, a month is not a contiguous range of the index
+    range_year, range_month = (year, month) if year is not None else (None, None)
+    lower, upper = _time_bounds(tz, range_year, range_month, start, end)
+
+    if by_turbine:
+        names = [turbine] if turbine is not None else index.get_level_values(0).unique()
+        blocks = []
+        for name in names:
+            first, last = index.slice_locs(name, name)
+            block_times = index[first:last].get_level_values(-1)
+            blocks.append(slice(first + _position(block_times, lower, 0),
+                                first + _position(block_times, upper, last - first)))
+        if len(blocks) == 1:
+            subset = read_df.iloc[blocks[0]]
+        else:
+            subset = read_df.iloc[np.concatenate([np.arange(block.start, block.stop) for block in blocks])]
+        turbine = None
+    elif index.is_monotonic_increasing:
+        subset = read_df.iloc[_position(index, lower, 0):_position(index, upper, len(index))]
+    else:
+        # Unsorted index (e.g. several turbines concatenated by load_all): fall back to a scan
+        mask = np.ones(len(read_df), dtype=bool)
+        if lower is not None:
+            mask &= index >= lower
+        if upper is not None:
+            mask &= index < upper
+        subset = read_df if mask.all() else read_df.loc[mask]
+
+    if turbine is not None:
+        subset = subset.loc[subset['Wind_turbine_name'] == turbine]
+
+    if month is not None and year is None:
+        subset = subset.loc[_calendar_values(subset, 'Month') == month]
+
+    if hour is not None:
+        subset = subset.loc[_calendar_values(subset, 'HourOfDay') == hour]
+
+    return subset
+
+
+def _select_by_column(read_df, year, month, hour, date_column, start, end, turbine):
+    """Selection on a raw DataFrame, scanning its datetime column."""
+
+    subset = read_df
 
     if year is not None:
         subset = subset.loc[subset[date_column].dt.year == year]
@@ -32,38 +122,119 @@ def select_time_subset(read_df, year=None, month=None, hour=None, date_column='D
     if hour is not None:
         subset = subset.loc[subset[date_column].dt.hour == hour]
 
+    lower, upper = _time_bounds(subset[date_column].dt.tz, None, None, start, end)
+    if lower is not None:
+        subset = subset.loc[subset[date_column] >= lower]
+    if upper is not None:
+        subset = subset.loc[subset[date_column] < upper]
+
+    if turbine is not None:
+        subset = subset.loc[subset['Wind_turbine_name'] == turbine]
+
     return subset
 
 
-def compare_data_libraries(folder_path):
+def _to_timestamp(value, tz):
+    """Converts a date to a Timestamp in the time zone of the index."""
+    timestamp = pd.Timestamp(value)
+    if tz is None:
+        return timestamp.tz_localize(None) if timestamp.tzinfo is not None else timestamp
+    return timestamp.tz_localize(tz) if timestamp.tzinfo is None else timestamp.tz_convert(tz)
+
+
+def _time_bounds(tz, year, month, start, end):
+    """Returns the [lower, upper) time bounds of a selection, None meaning unbounded."""
+
+    lower, upper = None, None
+    if year is not None:
+        lower = pd.Timestamp(year=year, month=month or 1, day=1, tz=tz)
+        upper = lower + (pd.DateOffset(months=1) if month is not None else pd.DateOffset(years=1))
+    if start is not None:
+        start = _to_timestamp(start, tz)
+        lower = start if lower is None else max(lower, start)
+    if end is not None:
+        end = _to_timestamp(end, tz)
+        upper = end if upper is None else min(upper, end)
+
+    return lower, upper
+
+
+def _position(times, bound, default):
+    """Binary search of a time bound in a sorted DatetimeIndex."""
+    return default if bound is None else times.searchsorted(bound, side='left')
+
+
+def _calendar_values(df, column):
+    """Returns a calendar column precomputed by polish_data, or derives it from the datetime index."""
+    if column in df.columns:
+        return df[column].to_numpy()
+    times = df.index.get_level_values(-1)
+    return times.month if column == 'Month' else times.hour
+
+
+def sort_time_index(df):
+    """
+    Sorts a DataFrame by its datetime index, if it is not sorted yet, so that select_time_subset can
+    use binary search. The sort is stable, rows with the same timestamp keep their order.
+
+    Parameters:
+    - df (DataFrame): A DataFrame processed by polish_data.
+
+    Returns:
+    - DataFrame: The sorted DataFrame (the same object if it was already sorted).
+    """
+    return df if df.index.is_monotonic_increasing else df.sort_index(kind='stable')
+
+
+def index_by_turbine(df, turbine_column='Wind_turbine_name'):
+    """
+    Replaces the datetime index with a sorted (turbine, datetime) MultiIndex, so that select_time_subset
+    can slice one turbine and a time range by binary search.
+
+    Parameters:
+    - df (DataFrame): A DataFrame processed by polish_data, e.g. the output of load_all.
+    - turbine_column (str): Name of the column containing the turbine names. Default is 'Wind_turbine_name'.
+
+    Returns:
+    - DataFrame: The DataFrame indexed by turbine and datetime.
+    """
+    return df.set_index(turbine_column, append=True).swaplevel().sort_index(kind='stable')
+
+
+def compare_data_libraries(folder_path, libraries=None, repeats=3, warmup=1):
     """
     Compares the performance of different data processing libraries (pandas, dask, vaex, modin)
-    by reading, concatenating, and processing CSV files stored in a specified folder.
+    by reading and concatenating the CSV files stored in a specified folder into a fully materialized
+    DataFrame.
 
-    The function logs the execution time and memory usage for each library, providing insights into
-    their efficiency for handling multiple CSV files. The function is useful for benchmarking
-    the libraries on real-world data processing tasks.
+    The function logs the execution time and peak memory usage for each library, providing insights into
+    their efficiency for handling multiple CSV files. The measurements are done by
+    windml.core.benchmark: warm-up runs, repeated measured runs, and RSS sampled while the files are read.
 
     Parameters:
     - folder_path (str): The path to the directory containing the CSV files. The files should
                          start with 'R' and have a '.csv' extension.
+    - libraries (list, optional): Libraries to compare. Default is all four.
+    - repeats (int): Number of measured runs per library. Default is 3.
+    - warmup (int): Number of runs executed before measuring. Default is 1.
 
     Notes:
     - This function assumes that the CSV files share a consistent structure suitable for the
       specified dtypes.
-    - Requires the installation of pandas, dask, vaex, modin, and memory_profiler.
+    - dask, vaex and modin are optional 'benchmark' dependencies, installed with
+      `poetry install -E benchmark`. They are imported only when this function runs.
+
+    Returns:
+    - list: The benchmark records (see windml.core.benchmark.save_results to store them).
 
     Outputs:
-    - Console output logging the number of files processed, their sizes, the processing time,
+    - Console output logging the number of files processed, their sizes, the median processing time,
       and maximum memory usage for each library.
     """
-
-    libraries = ['pandas', 'dask', 'vaex', 'modin']
-    dtypes = {'Date_time': 'object', 'Date_time_nr': 'int64', 'Wind_turbine_name': 'object'}
+    from .benchmark import run_benchmark, summarize
 
     # Gather CSV files
-    csv_files = [os.path.join(folder_path, file) for file in os.listdir(folder_path) if
-                 file.endswith('.csv') and file.startswith('R')]
+    csv_files = list_csv_files(folder_path)
 
     # Log file details
     print(f"Found {len(csv_files)} CSV files.")
@@ -71,107 +242,363 @@ def compare_data_libraries(folder_path):
         size = os.path.getsize(file) / (1024 * 1024)  # Size in MB
         print(f"File: {os.path.basename(file)}, Size: {size:.2f} MB")
 
-    for library in libraries:
-        start_time = time.time()
+    records = run_benchmark(folder_path, libraries=libraries, repeats=repeats, warmup=warmup)
+    for row in summarize(records).itertuples():
+        print(f"Library: {row.library}, Time taken: {row.time_s:.2f} seconds, "
+              f"Max memory usage: {row.peak_rss_mb:.2f} MB")
+
+    return records
 
-        if library == 'pandas':
-            dataframes = [pd.read_csv(file, dtype=dtypes) for file in csv_files]
-            df = pd.concat(dataframes)
-        elif library == 'dask':
-            from distributed import Client
-            client = Client()
-            dataframes = [dd.read_csv(file, dtype=dtypes) for file in csv_files]
-            df = dd.concat(dataframes).compute()
-        elif library == 'vaex':
-            df = vaex.open_many(csv_files)
-        elif library == 'modin':
-            dataframes = [mpd.read_csv(file, dtype=dtypes) for file in csv_files]
-            df = mpd.concat(dataframes)
 
-        end_time = time.time()
-        max_memory = max(memory_usage((lambda: None, ())))
-        print(
-            f"Library: {library}, Time taken: {end_time - start_time:.2f} seconds, Max memory usage: {max_memory:.2f} MB")
+def read_turbine_csv(filename, columns=None, use_cache=False, cache_dir=None, memory_map=False):
+    """
+    Reads a turbine CSV file into a pandas DataFrame with the 'Date_time' column parsed.
 
+    When the cache is enabled, the first read stores a typed, compressed Parquet copy of the file
+    (see windml.core.cache) and later reads are served from it, as long as the source file and the
+    dtype specification are unchanged.
 
-def load_one(filename, subset_size=False):
+    Parameters:
+    - filename (str): The path to the CSV file to be read.
+    - columns (list, optional): Subset of columns to return. Default is None (all columns).
+    - use_cache (bool): If True, read from and populate the Parquet cache. Default is False.
+    - cache_dir (str, optional): Folder holding the cache files. Default is config.CACHE_DIR.
+    - memory_map (bool): If True, cache files are memory-mapped when read. Default is False.
+
+    Returns:
+    - DataFrame: The content of the CSV file.
+    """
+
+    if use_cache:
+        df = read_cache(filename, DTYPES, cache_dir=cache_dir, columns=columns, memory_map=memory_map)
+        if df is not None:
+            return _restore_dtypes(df)
+
+    df = pd.read_csv(filename,
+                     dtype=DTYPES,
+                     parse_dates=['Date_time'],
+                     date_format=DATE_FORMAT
+                     )
+
+    if use_cache:
+        # Cache the whole file so that later reads can pick any subset of columns
+        write_cache(df, filename, DTYPES, cache_dir=cache_dir)
+
+    if columns is not None:
+        df = df[list(columns)]
+
+    return df
+
+
+def read_new_rows(filename, offset=0, columns=None):
+    """
+    Reads the rows appended to a turbine CSV file since a previous read, without parsing the rows
+    already read: the file is read from a byte offset returned by the previous call.
+
+    Only complete lines are read, so a line being written at the time of the call is left for the next one.
+
+    Parameters:
+    - filename (str): The path to the CSV file.
+    - offset (int): Byte offset returned by the previous call. Default is 0 (read the whole file).
+    - columns (list, optional): Subset of columns to read. 'Date_time' is always read.
+
+    Returns:
+    - tuple: The new rows, processed by polish_data, and the offset to pass to the next call.
+
+    Example:
+    >>> df, offset = read_new_rows("path/to/data.csv")
+    >>> new_df, offset = read_new_rows("path/to/data.csv", offset)  # the next night
+    """
+
+    with open(filename, 'rb') as f:
+        header = f.readline()
+        f.seek(max(offset, len(header)))
+        data = f.read()
+
+    # Drop an incomplete last line
+    data = data[:data.rfind(b'\n') + 1]
+    new_offset = max(offset, len(header)) + len(data)
+
+    df = pd.read_csv(io.BytesIO(header + data),
+                     dtype=DTYPES,
+                     usecols=_with_date_column(columns),
+                     parse_dates=['Date_time'],
+                     date_format=DATE_FORMAT
+                     )
+
+    return polish_data(df), new_offset
+
+
+def _restore_dtypes(df):
+    """Casts columns back to the declared DTYPES, which Arrow/Parquet map to their own string type."""
+    return df.astype({column: dtype for column, dtype in DTYPES.items()
+                      if column in df.columns and column != 'Date_time'
+                      and not isinstance(df[column].dtype, pd.CategoricalDtype)})
+
+
+def list_csv_files(folder_path):
+    """
+    Returns the turbine CSV files of a folder, i.e. the files starting with 'R' and ending with '.csv'.
+
+    Parameters:
+    - folder_path (str): The path to the directory containing the CSV files.
+
+    Returns:
+    - list: The paths of the CSV files.
+    """
+    return [os.path.join(folder_path, file) for file in os.listdir(folder_path) if
+            file.endswith('.csv') and file.startswith('R')]
+
+
+def compact_frame(df):
+    """
+    Converts a DataFrame to the compact schema COMPACT_DTYPES: float32 signal columns, categorical
+    turbine names and int8/int16 calendar columns. Float64 columns that are not declared but follow
+    the '_avg', '_min', '_max', '_std' naming are converted to float32 as well.
+
+    Parameters:
+    - df (DataFrame): The DataFrame to convert.
+
+    Returns:
+    - DataFrame: The compacted DataFrame.
+
+    Example:
+    >>> compact_df = compact_frame(df)
+    >>> print(memory_mb(df), memory_mb(compact_df))
+    """
+
+    dtypes = {}
+    for column, dtype in df.dtypes.items():
+        target = COMPACT_DTYPES.get(column)
+        if target is None and str(column).endswith(SIGNAL_SUFFIXES) and dtype == 'float64':
+            target = 'float32'
+        # Skip columns already compacted, astype would copy them
+        if target is not None and str(dtype) != target:
+            dtypes[column] = target
+
+    return df.astype(dtypes) if dtypes else df
+
+
+def _log_compaction(source, before, after):
+    """Logs the memory usage of a loaded DataFrame before and after compact_frame, in MB."""
+    logger.info('%s: %.1f MB before compaction, %.1f MB after (%.1f MB saved, %.0f%%)', source, before, after,
+                before - after, 100 * (before - after) / before if before else 0.)
+
+
+def memory_mb(df):
+    """Returns the memory usage of a DataFrame in megabytes, including the content of object columns."""
+    return df.memory_usage(deep=True).sum() / (1024 ** 2)  # Convert bytes to MB
+
+
+def _read_to_arrow(file, columns, use_cache, cache_dir, memory_map, downcast, quality_rules=None):
+    """
+    Reads one CSV file and converts it to an Arrow table, so the pandas copy can be released right away.
+    Returns the table, the memory (MB) saved by the compaction and the quality summary of the file, if checked.
+    """
+    import pyarrow as pa
+
+    df = read_turbine_csv(file, columns=columns, use_cache=use_cache, cache_dir=cache_dir, memory_map=memory_map)
+    summary = None
+    if quality_rules is not None:
+        from .quality import check_quality
+
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+            df, summary = check_quality(polish_data(df), rules=quality_rules)
+            # The merged table is polished again by load_all
+            df = df.drop(columns=CALENDAR_COLUMNS).reset_index()
+    saved_memory = 0.
+    if downcast:
+        before = memory_mb(df)
+        df = compact_frame(df)
+        saved_memory = before - memory_mb(df)
+    return pa.Table.from_pandas(df, preserve_index=False), saved_memory, summary
+
+
+def _quality_rules(quality):
+    """Rules of the quality pass requested by the quality argument of the loaders, None if disabled."""
+    if quality is None or quality is False:
+        return None
+    return {} if quality is True else dict(quality)
+
+
+def _with_date_column(columns):
+    """Adds 'Date_time' to a column selection, since polish_data needs it."""
+    if columns is None or 'Date_time' in columns:
+        return columns
+    return ['Date_time'] + list(columns)
+
+
+def load_one(filename, subset_size=False, columns=None, use_cache=False, cache_dir=None, memory_map=False,
+             downcast=False, quality=False):
     """
         Loads a CSV file into a pandas DataFrame, applies data polishing, and optionally samples a subset
-        of the data. It also measures and reports the loading time and memory usage.
+        of the data.
 
-        This function is useful for benchmarking data loading and processing performance, and for handling
-        large datasets by sampling.
+        The parse, polish and sample stages are recorded as instrumentation spans ('load_one.parse',
+        'load_one.polish', 'load_one.sample' within 'load_one'), with their wall time, CPU time, peak RSS
+        and number of rows, and the memory usage of the result. Nothing is printed: see
+        windml.core.instrumentation to enable, query or export the spans.
 
         Parameters:
         - filename (str): The path to the CSV file to be loaded.
         - subset_size (int, optional): If specified, the DataFrame will be sampled to this number of rows
                                        to potentially reduce memory usage and processing time.
+        - columns (list, optional): Subset of columns to load. 'Date_time' is always loaded.
+        - use_cache (bool): If True, the file is served from (and stored into) the Parquet cache.
+        - cache_dir (str, optional): Folder holding the cache files. Default is config.CACHE_DIR.
+        - memory_map (bool): If True, cache files are memory-mapped when read.
+        - downcast (bool): If True, the DataFrame is converted to the compact schema (see compact_frame),
+                           and its memory usage before and after is logged at INFO level (logger
+                           'windml.core.functions') and recorded in the span.
+        - quality (bool or dict): If True, or a dictionary of rules (see DEFAULT_QUALITY_RULES), the polished
+                                  DataFrame is regularized and flagged by windml.core.quality.check_quality
+                                  before sampling. Default is False.
 
         Returns:
-        - DataFrame: The processed DataFrame.
-
-        Outputs:
-        - Prints the loading time in seconds.
-        - Prints the memory usage in megabytes.
-        - Prints the number of lines in the final DataFrame.
+        - DataFrame: The processed DataFrame, or a tuple of the DataFrame and the quality summary if quality
+                     is enabled.
 
         Example:
         >>> df = load_one("path/to/data.csv", subset_size=1000)
         >>> print(df.head())
     """
 
-    start_time = time.time()
-    dtypes = {'Date_time': 'object', 'Date_time_nr': 'int64', 'Wind_turbine_name': 'object'}
+    with span('load_one', file=os.path.basename(filename)) as load_record:
+        with span('load_one.parse') as record:
+            df = read_turbine_csv(filename,
+                                  columns=_with_date_column(columns),
+                                  use_cache=use_cache,
+                                  cache_dir=cache_dir,
+                                  memory_map=memory_map)
+            record['rows'] = len(df)
 
-    df = pd.read_csv(filename,
-                     dtype=dtypes,
-                     parse_dates=['Date_time'],
-                     date_format='%Y-%m-%d %H:%M:%S%z'
-                     )
-    end_time = time.time()
+        with span('load_one.polish', rows=len(df)):
+            df = polish_data(df)
 
-    df = polish_data(df)
+        quality_rules = _quality_rules(quality)
+        if quality_rules is not None:
+            from .quality import check_quality
 
-    if subset_size:
-        # Extract a subset of the database to speed up the calculation
-        # Adjust to your machine
+            df, summary = check_quality(df, rules=quality_rules)
 
-        df = df.sample(subset_size)
+        if subset_size:
+            # Extract a subset of the database to speed up the calculation
+            # Adjust to your machine
+            with span('load_one.sample', rows=subset_size):
+                df = df.sample(subset_size)
 
-    used_memory = df.memory_usage(deep=True).sum() / (1024 ** 2)  # Convert bytes to MB
-    print(f"Loading time: {end_time - start_time:.2f} seconds.")
-    print(f"Memory usage: {used_memory:.2f} MB.")
-    print(f"{len(df)} Lines found.")
+        if downcast:
+            before = memory_mb(df)
+            df = compact_frame(df)
+            load_record['saved_mb'] = before - memory_mb(df)
+            _log_compaction(os.path.basename(filename), before, memory_mb(df))
 
-    return df
+        load_record['rows'] = len(df)
+        if is_enabled():
+            # Deep scan of the object columns, only done when the span is recorded
+            load_record['memory_mb'] = memory_mb(df)
 
+    return (df, summary) if quality_rules is not None else df
 
-def load_all(folder_path):
-    """Load all CSV files and measure the time and memory usage."""
-    start_time = time.time()
-    dtypes = {'Date_time': 'object', 'Date_time_nr': 'int64', 'Wind_turbine_name': 'object'}
 
-    # Gather CSV files
-    csv_files = [os.path.join(folder_path, file) for file in os.listdir(folder_path) if
-                 file.endswith('.csv') and file.startswith('R')]
+def load_all(folder_path, columns=None, use_cache=False, cache_dir=None, memory_map=False,
+             n_workers=None, executor='thread', downcast=False, quality=False):
+    """
+    Load all CSV files.
 
-    dataframes = [
-        pd.read_csv(file,
-                    dtype=dtypes,
-                    parse_dates=['Date_time'],
-                    date_format='%Y-%m-%d %H:%M:%S%z') for file in csv_files
-        ]
+    Files are parsed concurrently by a pool of workers. Each parsed file is handed over as an Arrow table,
+    the tables are concatenated without copying and converted to pandas block by block, releasing the
+    Arrow buffers as they are consumed. The peak memory is therefore close to the size of the final
+    DataFrame rather than twice its size, as with a plain pd.concat of the per-file DataFrames.
 
-    df = pd.concat(dataframes)
-    end_time = time.time()
+    The parse, merge and polish stages are recorded as instrumentation spans ('load_all.parse',
+    'load_all.merge', 'load_all.polish' within 'load_all'), see load_one.
 
-    df = polish_data(df)
+    Parameters:
+    - folder_path (str): The path to the directory containing the CSV files. The files should
+                         start with 'R' and have a '.csv' extension.
+    - columns (list, optional): Subset of columns to load. 'Date_time' is always loaded.
+    - use_cache (bool): If True, files are served from (and stored into) the Parquet cache.
+    - cache_dir (str, optional): Folder holding the cache files. Default is config.CACHE_DIR.
+    - memory_map (bool): If True, cache files are memory-mapped when read.
+    - n_workers (int, optional): Number of files parsed concurrently. Default is the number of CPUs,
+                                 capped to the number of files. Use 1 to read the files serially.
+    - executor (str): 'thread' or 'process'. Threads avoid transferring the parsed data between
+                      processes, processes avoid the GIL on the Python parts of the parsing.
+    - downcast (bool): If True, every file is converted to the compact schema (see compact_frame) before
+                       merging, and the memory usage of the result before and after is logged at INFO
+                       level (logger 'windml.core.functions') and recorded in the span. Default is False,
+                       which keeps the schema of a plain pd.read_csv.
+    - quality (bool or dict): If True, or a dictionary of rules (see DEFAULT_QUALITY_RULES), every file is
+                              regularized and flagged by windml.core.quality.check_quality in the workers,
+                              right after parsing, so the quality pass runs in parallel across the files.
+                              Each file is expected to hold the complete records of its turbines.
+                              Default is False.
 
-    memory_usage = df.memory_usage(deep=True).sum() / (1024 ** 2)  # Convert bytes to MB
-    print(f"Loading time: {end_time - start_time:.2f} seconds.")
-    print(f"Memory usage: {memory_usage:.2f} MB.")
-    print(f"{len(df)} Lines found.")
+    Returns:
+    - DataFrame: The concatenated and processed DataFrame, or a tuple of the DataFrame and the quality
+                 summary (one row per turbine) if quality is enabled.
+    """
+    import pyarrow as pa
 
+    # Gather CSV files
+    csv_files = list_csv_files(folder_path)
+
+    if n_workers is None:
+        n_workers = os.cpu_count() or 1
+    n_workers = max(1, min(n_workers, len(csv_files)))
+
+    if executor == 'thread':
+        pool_class = ThreadPoolExecutor
+    elif executor == 'process':
+        pool_class = ProcessPoolExecutor
+    else:
+        raise ValueError(f"Unknown executor '{executor}', use 'thread' or 'process'.")
+
+    with span('load_all', files=len(csv_files), n_workers=n_workers, executor=executor) as load_record:
+        with span('load_all.parse') as record:
+            quality_rules = _quality_rules(quality)
+            read_file = partial(_read_to_arrow, columns=_with_date_column(columns), use_cache=use_cache,
+                                cache_dir=cache_dir, memory_map=memory_map, downcast=downcast,
+                                quality_rules=quality_rules)
+            with pool_class(max_workers=n_workers) as pool:
+                # map preserves the order of the files
+                results = list(pool.map(read_file, csv_files))
+
+            tables = [table for table, _, _ in results]
+            saved_memory = sum(saved for _, saved, _ in results)
+            summaries = [summary for _, _, summary in results if summary is not None]
+            del results
+            record['rows'] = sum(len(table) for table in tables)
+
+        with span('load_all.merge', rows=record['rows']):
+            table = pa.concat_tables(tables)
+            del tables
+            df = _restore_dtypes(table.to_pandas(self_destruct=True, split_blocks=True))
+            del table
+
+        with span('load_all.polish', rows=len(df)):
+            # split_blocks leaves one block per column (consolidating would copy the data again),
+            # which pandas reports as fragmentation when polish_data adds the calendar columns
+            with warnings.catch_warnings():
+                warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+                df = polish_data(df)
+
+        if downcast:
+            # The signal columns are already compact, only the calendar columns are left
+            before = memory_mb(df)
+            df = compact_frame(df)
+            load_record['saved_mb'] = saved_memory + before - memory_mb(df)
+            _log_compaction(folder_path, memory_mb(df) + load_record['saved_mb'], memory_mb(df))
+
+        load_record['rows'] = len(df)
+        if is_enabled():
+            # Deep scan of the object columns, only done when the span is recorded
+            load_record['memory_mb'] = memory_mb(df)
+
+    if quality_rules is not None:
+        return df, pd.concat(summaries)
     return df
 
 
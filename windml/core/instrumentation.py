@@ -0,0 +1,241 @@
+"""
+Spans: wall time, CPU time and resident memory of the stages of a run (loading, fitting, predicting...).
+
+Spans are recorded in the process that runs them. The stages run by joblib or process pool workers (e.g.
+load_all with executor='process', grid searches with n_jobs > 1) record their spans in the workers, which
+are not sent back to the parent process: get_spans, summarize_spans and export_json only see the spans of
+the calling process. The memory of the workers is still included in the RSS of the spans of the parent
+(see sample_rss), and their time in its wall time.
+"""
+
+import os
+import json
+import time
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+import psutil
+
+# Spans are only recorded when enabled, with enable() or the WINDML_INSTRUMENTATION environment variable
+_settings = {'enabled': bool(os.environ.get('WINDML_INSTRUMENTATION')), 'verbose': False}
+_spans = []
+_lock = threading.Lock()
+_current_span = contextvars.ContextVar('windml_current_span', default=None)
+
+
+def enable(verbose=False):
+    """
+    Starts recording spans in this process.
+
+    Parameters:
+    - verbose (bool): If True, every span is also printed when it ends. Default is False.
+    """
+    _settings.update(enabled=True, verbose=verbose)
+
+
+def disable():
+    """Stops recording spans. The spans already recorded are kept (see clear)."""
+    _settings.update(enabled=False, verbose=False)
+
+
+def is_enabled():
+    return _settings['enabled']
+
+
+def _rss_mb(process):
+    """Resident memory of a process and its children (e.g. joblib workers), in MB."""
+    rss = process.memory_info().rss
+    for child in process.children(recursive=True):
+        try:
+            rss += child.memory_info().rss
+        except psutil.Error:  # The child ended meanwhile
+            pass
+    return rss / 1024 ** 2
+
+
+@contextmanager
+def sample_rss(interval=0.01):
+    """
+    Samples the resident memory of the process and its children (e.g. joblib workers) in a background
+    thread while the block runs.
+
+    Parameters:
+    - interval (float): Time between two samples, in seconds. Default is 0.01.
+
+    Yields:
+    - dict: 'start_mb' when the block starts, then 'peak_mb' (highest sample while the block ran) and
+            'end_mb' once it ends.
+
+    Example:
+    >>> with sample_rss() as memory:
+    ...     model.fit(X, y)
+    >>> memory['peak_mb'] - memory['start_mb']
+    """
+
+    process = psutil.Process()
+    memory = {'start_mb': _rss_mb(process)}
+    memory['peak_mb'] = memory['start_mb']
+    done = threading.Event()
+
+    def sample():
+        while not done.wait(interval):
+            memory['peak_mb'] = max(memory['peak_mb'], _rss_mb(process))
+
+    sampler = threading.Thread(target=sample, daemon=True)
+    sampler.start()
+    try:
+        yield memory
+    finally:
+        done.set()
+        sampler.join()
+        memory['end_mb'] = _rss_mb(process)
+        memory['peak_mb'] = max(memory['peak_mb'], memory['end_mb'])
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Measures a stage of a run: wall time, CPU time of the process, and RSS of the process and its children
+    sampled during the stage (see sample_rss): peak, at the start, and change between start and end. Plus any
+    attribute given here or set on the yielded record (e.g. the number of rows).
+    Spans can be nested, each record keeps the name of its parent.
+
+    When recording is disabled (the default) the cost is a dictionary creation, and nothing is printed.
+
+    Parameters:
+    - name (str): Name of the stage, e.g. 'load_all.parse'.
+    - **attributes: Attributes stored with the record.
+
+    Yields:
+    - dict: The record, attributes can be added to it until the span ends.
+
+    Example:
+    >>> with span('polish', file='R80711.csv') as record:
+    ...     df = polish_data(df)
+    ...     record['rows'] = len(df)
+    """
+
+    record = dict(attributes)
+    if not _settings['enabled']:
+        yield record
+        return
+
+    parent = _current_span.get()
+    token = _current_span.set(name)
+    try:
+        with sample_rss() as memory:
+            start, wall_start, cpu_start = time.time(), time.perf_counter(), time.process_time()
+            try:
+                yield record
+            finally:
+                wall_time = time.perf_counter() - wall_start
+                cpu_time = time.process_time() - cpu_start
+    finally:
+        _current_span.reset(token)
+
+        record = {
+            'name': name,
+            'parent': parent,
+            'start': start,
+            'wall_s': wall_time,
+            'cpu_s': cpu_time,
+            'peak_rss_mb': memory['peak_mb'],
+            'rss_start_mb': memory['start_mb'],
+            'rss_delta_mb': memory['end_mb'] - memory['start_mb'],
+            'pid': os.getpid(),
+            **record,
+        }
+        with _lock:
+            _spans.append(record)
+
+        if _settings['verbose']:
+            details = ', '.join(f'{key}: {value:.2f}' if isinstance(value, float) else f'{key}: {value}'
+                                for key, value in record.items() if key not in ('name', 'parent', 'start', 'pid'))
+            print(f'{name}: {details}')
+
+
+def instrument(name=None):
+    """
+    Decorator recording every call of a function as a span (see span).
+
+    Parameters:
+    - name (str, optional): Name of the span. Default is the qualified name of the function.
+
+    Example:
+    >>> @instrument('features.compute')
+    ... def compute_features(df, spec): ...
+    """
+
+    def decorator(func):
+        span_name = name or f'{func.__module__}.{func.__qualname__}'
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not _settings['enabled']:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def get_spans(name=None):
+    """
+    Returns the recorded spans of this process. Spans of worker processes (e.g. joblib workers with
+    n_jobs > 1) are recorded in those processes and not returned (see the module docstring).
+
+    Parameters:
+    - name (str, optional): Only return the spans with this name. Default is None (all spans).
+
+    Returns:
+    - list: The records, in the order in which the spans ended.
+    """
+    with _lock:
+        return [dict(record) for record in _spans if name is None or record['name'] == name]
+
+
+def summarize_spans():
+    """
+    Summarizes the recorded spans per name: number of calls, total and mean wall time, total CPU time,
+    maximum peak RSS, largest RSS change and total number of rows.
+
+    Returns:
+    - DataFrame: One row per span name, sorted by total wall time.
+    """
+    import pandas as pd
+
+    df = pd.DataFrame(get_spans(), columns=['name', 'wall_s', 'cpu_s', 'peak_rss_mb', 'rss_delta_mb', 'rows'])
+    return df.groupby('name').agg(
+        calls=('wall_s', 'size'),
+        wall_s=('wall_s', 'sum'),
+        mean_wall_s=('wall_s', 'mean'),
+        cpu_s=('cpu_s', 'sum'),
+        peak_rss_mb=('peak_rss_mb', 'max'),
+        rss_delta_mb=('rss_delta_mb', 'max'),
+        rows=('rows', 'sum'),
+    ).sort_values('wall_s', ascending=False)
+
+
+def export_json(filename):
+    """
+    Writes the recorded spans to a JSON file, with the time of the export and the process id.
+
+    Parameters:
+    - filename (str): The output file.
+    """
+    output = {
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S%z'),
+        'pid': os.getpid(),
+        'spans': get_spans(),
+    }
+    with open(filename, 'w') as f:
+        json.dump(output, f, indent=2, default=str)
+
+
+def clear():
+    """Removes the recorded spans."""
+    with _lock:
+        _spans.clear()
@@ -0,0 +1,292 @@
+import warnings
+from functools import partial
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .instrumentation import span
+
+# Defaults for the Senvion MM82 turbines of La Haute Borne (ENGIE data). Durations are numbers of
+# 10-minute records, powers are in kW and wind speeds in m/s.
+DEFAULT_QUALITY_RULES = {
+    'freq': '10min',
+    'duplicates': 'most_complete',  # record kept for a duplicated timestamp: 'most_complete', 'first' or 'last'
+    'fill_limit': 3,            # gaps up to 30 minutes are interpolated, longer ones are left missing
+    'p_nom': 2050,
+    'nominal_tolerance': 0.05,  # P_avg above p_nom * (1 + tolerance) is impossible
+    'rotor_diameter': 82,
+    'air_density': 1.225,
+    'betz_tolerance': 1.2,      # margin for the nacelle anemometer and the averaging of v^3 over 10 minutes
+    'cut_in_speed': 3.,
+    'rated_speed': 14.5,
+    'cut_out_speed': 25.,
+    'idle_power_ratio': 0.02,   # auxiliaries consumption and measurement noise, as a fraction of p_nom
+    'curtailment_ratio': 0.8,
+    'max_wind_speed': 40.,
+    'frozen_records': 6,        # identical wind speeds during 1 hour
+}
+
+# Bits of the 'Quality_flags' column
+QUALITY_FLAGS = {
+    'gap': 1,                   # record inserted on the 10-minute grid
+    'filled': 2,                # inserted record interpolated from its neighbours
+    'missing': 4,               # P_avg or Ws_avg missing
+    'sensor_fault': 8,          # wind speed negative, above max_wind_speed or frozen
+    'above_nominal': 16,        # power above the nominal power
+    'above_betz': 32,           # power above the Betz limit of the measured wind speed
+    'power_without_wind': 64,   # power produced below the cut-in speed
+    'negative_power': 128,      # consumption above the auxiliaries consumption
+    'stopped': 256,             # no production between the cut-in and cut-out speeds
+    'curtailment': 512,         # production far below p_nom above the rated speed
+}
+# Flags of the records that should not reach the models
+FAULT_FLAGS = [flag for flag in QUALITY_FLAGS if flag not in ('gap', 'filled')]
+
+
+def betz_power(wind_speed, rotor_diameter=82, air_density=1.225):
+    """
+    Maximum power (kW) a rotor can extract from the wind according to the Betz limit:
+    16/27 * 1/2 * air_density * rotor_area * wind_speed^3.
+
+    Parameters:
+    - wind_speed (array): Wind speeds in m/s.
+    - rotor_diameter (float): Rotor diameter in m. Default is 82.
+    - air_density (float): Air density in kg/m3. Default is 1.225.
+
+    Returns:
+    - array: The maximum power in kW.
+    """
+    rotor_area = np.pi * (rotor_diameter / 2) ** 2
+    return 16 / 27 * 0.5 * air_density * rotor_area * np.asarray(wind_speed, dtype='float64') ** 3 / 1000
+
+
+def _run_lengths(starts):
+    """Length of the run of every element, runs starting where 'starts' is True (the first element always does)."""
+    run_ids = np.cumsum(starts) - 1
+    return np.bincount(run_ids)[run_ids]
+
+
+def _flag_records(df, gap, filled, rules):
+    """Quality bitmask of the records of one regularized turbine."""
+    flags = np.where(gap, QUALITY_FLAGS['gap'], 0).astype('uint16')
+    flags[filled] |= QUALITY_FLAGS['filled']
+    if 'P_avg' not in df.columns or 'Ws_avg' not in df.columns:
+        return flags
+
+    power = df['P_avg'].to_numpy(dtype='float64')
+    wind_speed = df['Ws_avg'].to_numpy(dtype='float64')
+    p_nom = rules['p_nom']
+    idle_power = rules['idle_power_ratio'] * p_nom
+    producing_range = (wind_speed >= rules['cut_in_speed']) & (wind_speed < rules['cut_out_speed'])
+
+    # Identical consecutive wind speeds (NaN never equals NaN, so missing values break the runs)
+    same = np.empty(len(wind_speed), dtype=bool)
+    same[0] = False
+    same[1:] = wind_speed[1:] == wind_speed[:-1]
+    frozen = _run_lengths(~same) >= rules['frozen_records']
+
+    # Comparisons with NaN are False, so missing records only get the 'missing' flag
+    conditions = {
+        'missing': np.isnan(power) | np.isnan(wind_speed),
+        'sensor_fault': (wind_speed < 0) | (wind_speed > rules['max_wind_speed']) | frozen,
+        'above_nominal': power > p_nom * (1 + rules['nominal_tolerance']),
+        'above_betz': power > rules['betz_tolerance'] * betz_power(wind_speed, rules['rotor_diameter'],
+                                                                    rules['air_density']) + idle_power,
+        'power_without_wind': (wind_speed < rules['cut_in_speed']) & (power > idle_power),
+        'negative_power': power < -idle_power,
+        'stopped': producing_range & (power <= 0),
+        'curtailment': (producing_range & (wind_speed >= rules['rated_speed']) & (power > 0)
+                        & (power < rules['curtailment_ratio'] * p_nom)),
+    }
+    for flag, condition in conditions.items():
+        flags[condition] |= QUALITY_FLAGS[flag]
+    return flags
+
+
+def _check_turbine(df, rules):
+    """Regularizes and flags the records of one turbine, returns the result and its summary."""
+    freq = pd.Timedelta(rules['freq'])
+    rows = len(df)
+
+    # Snap the timestamps to the grid, sort them and keep one record of every timestamp (see 'duplicates')
+    times = df.index.round(freq)
+    off_grid = int((times != df.index).sum())
+    df = df.set_axis(times)
+    if not df.index.is_monotonic_increasing:
+        df = df.sort_index(kind='stable')
+    duplicated = df.index.duplicated(keep='last' if rules['duplicates'] == 'last' else 'first')
+    if duplicated.any():
+        if rules['duplicates'] == 'most_complete':
+            # Fewest missing values first within every timestamp, the sort is stable so ties keep their order
+            order = np.lexsort((df.isna().sum(axis=1).to_numpy(), df.index.asi8))
+            df = df.iloc[order]
+            duplicated = df.index.duplicated(keep='first')
+        df = df.loc[~duplicated]
+
+    grid = pd.date_range(df.index[0], df.index[-1], freq=freq, name=df.index.name)
+    gap = np.zeros(len(grid), dtype=bool)
+    if len(grid) != len(df):
+        present = grid.get_indexer(df.index)
+        dtypes = df.dtypes
+        df = df.reindex(grid)
+        gap[:] = True
+        gap[present] = False
+
+        # reindex leaves NaN in the inserted records, restore the columns derived from the timestamp
+        for column, values in (('Year', grid.year), ('Month', grid.month), ('DayOfWeek', grid.dayofweek),
+                               ('HourOfDay', grid.hour),
+                               ('Date_time_nr', (grid - pd.Timestamp(0, tz=grid.tz)) // pd.Timedelta(seconds=1))):
+            if column in df.columns:
+                df[column] = np.asarray(values).astype(dtypes[column])
+        if 'Wind_turbine_name' in df.columns:
+            df['Wind_turbine_name'] = df['Wind_turbine_name'].ffill().astype(dtypes['Wind_turbine_name'])
+
+    # Interpolate the short gaps only, a long gap is not a straight line
+    gap_starts = np.empty(len(gap), dtype=bool)
+    gap_starts[0] = True
+    gap_starts[1:] = gap[1:] != gap[:-1]
+    gap_lengths = np.where(gap, _run_lengths(gap_starts), 0)
+    filled = gap & (gap_lengths <= rules['fill_limit'])
+    if filled.any():
+        # Linear interpolation between the records around each gap, the grid being regular
+        rows_filled = np.flatnonzero(filled)
+        records = np.flatnonzero(~gap)
+        after = records[np.searchsorted(records, rows_filled)]
+        before = records[np.searchsorted(records, rows_filled) - 1]
+        weights = ((rows_filled - before) / (after - before))[:, None]
+        float_columns = [column for column, dtype in df.dtypes.items() if pd.api.types.is_float_dtype(dtype)]
+        values_before = df[float_columns].iloc[before].to_numpy()
+        values_after = df[float_columns].iloc[after].to_numpy()
+        df.loc[filled, float_columns] = values_before + weights * (values_after - values_before)
+
+    flags = _flag_records(df, gap, filled, rules)
+    # Frames parsed by pandas 3 keep one block per column, which pandas reports as fragmentation
+    with warnings.catch_warnings():
+        warnings.simplefilter('ignore', pd.errors.PerformanceWarning)
+        df['Quality_flags'] = flags
+
+    summary = {
+        'start': grid[0],
+        'end': grid[-1],
+        'rows': rows,
+        'duplicates': int(duplicated.sum()),
+        'off_grid': off_grid,
+        'gaps': int((gap & gap_starts).sum()),
+        'missing_records': int(gap.sum()),
+        'filled_records': int(filled.sum()),
+        'longest_gap': freq * int(gap_lengths.max()),
+        'coverage': 1 - gap.mean(),
+        **{flag: int((flags & QUALITY_FLAGS[flag] > 0).sum()) for flag in FAULT_FLAGS},
+        'flagged_share': (flags & flag_bits(FAULT_FLAGS) > 0).mean(),
+    }
+    return df, summary
+
+
+def flag_bits(flags):
+    """Combined bits of a list of flag names (see QUALITY_FLAGS)."""
+    unknown = [flag for flag in flags if flag not in QUALITY_FLAGS]
+    if unknown:
+        raise ValueError(f"Unknown quality flags {unknown}, use {', '.join(QUALITY_FLAGS)}.")
+    return int(np.bitwise_or.reduce([QUALITY_FLAGS[flag] for flag in flags], initial=0))
+
+
+def check_quality(df, rules=None, n_workers=1, executor='process', group_col='Wind_turbine_name'):
+    """
+    Regularizes the records of every turbine onto the 10-minute grid and flags the records that should
+    not reach the models, with vectorized NumPy/pandas operations per turbine and the turbines processed
+    in parallel by n_workers.
+
+    For every turbine, timestamps are snapped to the grid and sorted, and duplicated timestamps are dropped.
+    The record kept is set by the 'duplicates' rule: the one with the fewest missing values
+    ('most_complete', the default, ties going to the first record in the order of df), or the first or
+    last one in the order of df ('first', 'last'). The missing intervals are then inserted. Gaps of up to
+    'fill_limit' records are interpolated in time, longer ones are left missing. Every record gets a bitmask in the
+    'Quality_flags' column (see QUALITY_FLAGS): inserted and interpolated records, missing values, wind
+    sensor faults, and power-vs-wind-speed points that are physically impossible (above the nominal power,
+    above the Betz limit, produced without wind) or show the turbine not producing normally (consumption,
+    stopped or curtailed).
+
+    Parameters:
+    - df (DataFrame): A DataFrame processed by polish_data, e.g. the output of load_all.
+    - rules (dict, optional): Values replacing those of DEFAULT_QUALITY_RULES (e.g. {'p_nom': 3000}).
+    - n_workers (int): Number of turbines processed in parallel. Default is 1.
+    - executor (str): 'process' or 'thread'. Default is 'process'.
+    - group_col (str): Column identifying the turbines. Default is 'Wind_turbine_name'.
+
+    Returns:
+    - tuple: The regularized DataFrame, grouped by turbine and sorted by time, with the 'Quality_flags' column, and
+             the quality summary, one row per turbine: time range, number of rows read, duplicates,
+             off-grid timestamps, gaps, missing and filled records, longest gap, coverage of the grid,
+             number of records of every fault flag and share of records with a fault.
+
+    Example:
+    >>> df, summary = check_quality(load_all('path/to/data'), n_workers=4)
+    >>> df = drop_flagged(df)
+    """
+
+    rules = {**DEFAULT_QUALITY_RULES, **(rules or {})}
+    if rules['duplicates'] not in ('most_complete', 'first', 'last'):
+        raise ValueError(f"Unknown duplicates rule '{rules['duplicates']}', use 'most_complete', 'first' or 'last'.")
+    if isinstance(df.index, pd.MultiIndex):
+        raise ValueError('check_quality expects the datetime index of polish_data, not index_by_turbine.')
+
+    if group_col in df.columns:
+        groups = [(name, group) for name, group in df.groupby(group_col, sort=False, observed=True)]
+    else:
+        groups = [(None, df)]
+    groups = [(name, group) for name, group in groups if len(group)]
+
+    if executor == 'thread':
+        pool_class = ThreadPoolExecutor
+    elif executor == 'process':
+        pool_class = ProcessPoolExecutor
+    else:
+        raise ValueError(f"Unknown executor '{executor}', use 'thread' or 'process'.")
+
+    with span('check_quality', rows=len(df), turbines=len(groups)) as record:
+        check = partial(_check_turbine, rules=rules)
+        frames = [group for _, group in groups]
+        if n_workers > 1 and len(frames) > 1:
+            with pool_class(max_workers=min(n_workers, len(frames))) as pool:
+                results = list(pool.map(check, frames))
+        else:
+            results = [check(frame) for frame in frames]
+
+        checked = pd.concat([frame for frame, _ in results]) if len(results) > 1 else results[0][0]
+        summary = pd.DataFrame([summary for _, summary in results],
+                               index=pd.Index([name for name, _ in groups], name=group_col))
+        record['flagged'] = int(flag_mask(checked).sum())
+        record['inserted'] = int(summary['missing_records'].sum())
+
+    return checked, summary
+
+
+def flag_mask(df, flags=FAULT_FLAGS):
+    """
+    Returns the records having at least one of the given quality flags.
+
+    Parameters:
+    - df (DataFrame): A DataFrame processed by check_quality.
+    - flags (list): Flag names, see QUALITY_FLAGS. Default is FAULT_FLAGS.
+
+    Returns:
+    - array: Boolean mask of the records.
+    """
+    return df['Quality_flags'].to_numpy() & flag_bits(flags) > 0
+
+
+def drop_flagged(df, flags=FAULT_FLAGS):
+    """
+    Removes the records having one of the given quality flags, and the 'Quality_flags' column, so that
+    the result can be passed to the forecasts, the regressors and the correlation analysis.
+
+    With the default flags, interpolated records are kept and the records of long gaps (missing) are
+    removed.
+
+    Parameters:
+    - df (DataFrame): A DataFrame processed by check_quality.
+    - flags (list): Flag names, see QUALITY_FLAGS. Default is FAULT_FLAGS.
+
+    Returns:
+    - DataFrame: The records without those flags.
+    """
+    return df.loc[~flag_mask(df, flags)].drop(columns='Quality_flags')
@@ -0,0 +1,202 @@
+from pathlib import Path
+import numpy as np
+import pandas as pd
+from ..config import DATA_DIR
+from .streaming import partial_aggregate, merge_partials, STATISTICS
+
+ROLLUP_DIR = DATA_DIR / 'rollups'
+ROLLUP_FREQS = {'hourly': 'h', 'daily': 'D', 'monthly': 'MS'}
+ROLLUP_COLUMNS = ['P_avg', 'Ws_avg']
+
+
+def _time_rollup(df, freq, value_cols, group_col):
+    """Partial statistics (sum, count, min, max) per turbine and time bin, empty bins dropped."""
+    rollup = partial_aggregate(df, value_cols, by=[group_col, pd.Grouper(freq=freq)])
+    return rollup[rollup['count'].sum(axis=1) > 0]
+
+
+def windrose_histogram(df, direction='Wa_avg', var='Ws_avg', nsector=16, bins=np.arange(0, 8, 1),
+                       group_col='Wind_turbine_name'):
+    """
+    Counts the records per turbine, direction sector and speed bin, with the binning of the windrose
+    package: nsector sectors centered on North (0 degrees), and speed bins starting at the values of
+    'bins', the last one open-ended. Records below the first bin or with missing values are not counted.
+
+    Parameters:
+    - df (DataFrame): The data, with the direction, var and group_col columns.
+    - direction (str): Column of the wind direction in degrees. Default is 'Wa_avg'.
+    - var (str): Column of the wind speed. Default is 'Ws_avg'.
+    - nsector (int): Number of direction sectors. Default is 16.
+    - bins (array): Lower edges of the speed bins. Default is np.arange(0, 8, 1).
+    - group_col (str): Column identifying the turbines. Default is 'Wind_turbine_name'.
+
+    Returns:
+    - DataFrame: Counts indexed by turbine, with one row per sector ('direction', in degrees) and
+                 one column per speed bin (its lower edge).
+    """
+
+    bins = np.asarray(bins, dtype='float64')
+    sector = 360. / nsector
+    wind_direction = df[direction].to_numpy(dtype='float64')
+    wind_speed = df[var].to_numpy(dtype='float64')
+
+    valid = ~np.isnan(wind_direction) & ~np.isnan(wind_speed) & (wind_speed >= bins[0])
+    sector_index = (((wind_direction[valid] + sector / 2) % 360.) // sector).astype('int64')
+    speed_index = np.searchsorted(bins, wind_speed[valid], side='right') - 1
+
+    turbine_codes, turbines = pd.factorize(df[group_col].to_numpy()[valid])
+    flat_index = (turbine_codes * nsector + sector_index) * len(bins) + speed_index
+    counts = np.bincount(flat_index, minlength=len(turbines) * nsector * len(bins))
+
+    index = pd.MultiIndex.from_product([turbines, np.arange(nsector) * sector], names=[group_col, 'direction'])
+    return pd.DataFrame(counts.reshape(len(turbines) * nsector, len(bins)), index=index, columns=bins)
+
+
+def build_rollups(df, value_cols=ROLLUP_COLUMNS, freqs=ROLLUP_FREQS, windrose=True, group_col='Wind_turbine_name'):
+    """
+    Materializes hourly, daily and monthly aggregates per turbine and the windrose histogram of a
+    DataFrame, so that plots and forecasts do not need to scan the 10-minute records again.
+
+    The time rollups keep the partial statistics (sum, count, min, max) of every column, so that they can
+    be updated with new records (update_rollups) and the mean derived at any time (sum / count).
+
+    Parameters:
+    - df (DataFrame): A DataFrame processed by polish_data, e.g. the output of load_all.
+    - value_cols (list): Columns to aggregate. Default is ROLLUP_COLUMNS.
+    - freqs (dict): Rollup names mapped to pandas frequencies. Default is ROLLUP_FREQS.
+    - windrose (bool): If True, the windrose histogram is computed as well (rollup 'windrose').
+    - group_col (str): Column identifying the turbines. Default is 'Wind_turbine_name'.
+
+    Returns:
+    - dict: Rollup name mapped to its DataFrame.
+
+    Example:
+    >>> rollups = build_rollups(load_all('path/to/data'))
+    >>> monthly_df = rollup_energy(rollups['monthly'])
+    """
+
+    rollups = {name: _time_rollup(df, freq, value_cols, group_col) for name, freq in freqs.items()}
+    if windrose:
+        rollups['windrose'] = windrose_histogram(df, group_col=group_col)
+    return rollups
+
+
+def update_rollups(rollups, new_df, freqs=ROLLUP_FREQS, group_col='Wind_turbine_name'):
+    """
+    Updates rollups with new records: the partial statistics of the new records are merged into the
+    existing ones (a time bin split between the old and the new records is combined correctly) and
+    the windrose counts are added.
+
+    Parameters:
+    - rollups (dict): Rollups returned by build_rollups or load_rollups.
+    - new_df (DataFrame): The new records, processed by polish_data (e.g. from read_new_rows).
+    - freqs (dict): Rollup names mapped to pandas frequencies. Default is ROLLUP_FREQS.
+    - group_col (str): Column identifying the turbines. Default is 'Wind_turbine_name'.
+
+    Returns:
+    - dict: The updated rollups.
+    """
+
+    updated = {}
+    for name, rollup in rollups.items():
+        if name == 'windrose':
+            new_counts = windrose_histogram(new_df, bins=rollup.columns.to_numpy(), nsector=rollup.index.levshape[1],
+                                            group_col=group_col)
+            updated[name] = rollup.add(new_counts, fill_value=0).astype('int64')
+        else:
+            new_rollup = _time_rollup(new_df, freqs[name], list(rollup['sum'].columns), group_col)
+            updated[name] = merge_partials([rollup, new_rollup])
+    return updated
+
+
+def rollup_statistics(rollup):
+    """
+    Converts a time rollup to a flat DataFrame with the sum, count, mean, min and max of every column.
+
+    Parameters:
+    - rollup (DataFrame): A time rollup ('hourly', 'daily' or 'monthly').
+
+    Returns:
+    - DataFrame: One row per turbine and time bin, with '<column>_<statistic>' columns.
+    """
+
+    result = rollup.copy()
+    for column in rollup['sum'].columns:
+        result[('mean', column)] = rollup[('sum', column)] / rollup[('count', column)]
+    result.columns = [f'{column}_{statistic}' for statistic, column in result.columns]
+    return result
+
+
+def rollup_energy(monthly_rollup, p_nom=2050, group_col='Wind_turbine_name'):
+    """
+    Derives the monthly DataFrame of the Time Series notebook (sums of 'P_avg', 'E_avg' = P_avg / 6000 in MWh
+    and 'CF_avg' = P_avg / P_nom) from the monthly rollup, ready for plot_monthly_evolution and the forecasts.
+
+    Parameters:
+    - monthly_rollup (DataFrame): The 'monthly' rollup.
+    - p_nom (float): Nominal power of the turbines in kW. Default is 2050.
+    - group_col (str): Column identifying the turbines. Default is 'Wind_turbine_name'.
+
+    Returns:
+    - DataFrame: One row per turbine and month with the columns group_col, 'Year', 'Month', 'P_avg',
+                 'E_avg' and 'CF_avg'.
+    """
+
+    power = monthly_rollup[('sum', 'P_avg')]
+    months = power.index.get_level_values(-1)
+    return pd.DataFrame({
+        group_col: power.index.get_level_values(0),
+        'Year': months.year,
+        'Month': months.month,
+        'P_avg': power.to_numpy(),
+        'E_avg': power.to_numpy() / 6000,  # from kW to MWh
+        'CF_avg': power.to_numpy() / p_nom,
+    })
+
+
+def save_rollups(rollups, folder=None):
+    """
+    Saves rollups as zstd-compressed Parquet files, one per rollup.
+
+    Parameters:
+    - rollups (dict): Rollups returned by build_rollups or update_rollups.
+    - folder (str, optional): Output folder. Default is ROLLUP_DIR.
+    """
+
+    folder = Path(folder) if folder is not None else ROLLUP_DIR
+    folder.mkdir(parents=True, exist_ok=True)
+    for name, rollup in rollups.items():
+        flat = rollup.copy()
+        if name == 'windrose':
+            flat.columns = [str(edge) for edge in rollup.columns]
+        else:
+            flat.columns = [f'{column}_{statistic}' for statistic, column in rollup.columns]
+        flat.to_parquet(folder / f'{name}.parquet', engine='pyarrow', compression='zstd')
+
+
+def load_rollups(folder=None, names=None):
+    """
+    Loads rollups saved by save_rollups.
+
+    Parameters:
+    - folder (str, optional): The folder of the rollups. Default is ROLLUP_DIR.
+    - names (list, optional): Rollups to load, e.g. ['monthly']. Default is None (all rollups).
+
+    Returns:
+    - dict: Rollup name mapped to its DataFrame.
+    """
+
+    folder = Path(folder) if folder is not None else ROLLUP_DIR
+    paths = [folder / f'{name}.parquet' for name in names] if names is not None else sorted(folder.glob('*.parquet'))
+
+    rollups = {}
+    for path in paths:
+        rollup = pd.read_parquet(path, engine='pyarrow')
+        if path.stem == 'windrose':
+            rollup.columns = [float(edge) for edge in rollup.columns]
+        else:
+            rollup.columns = pd.MultiIndex.from_tuples(
+                [tuple(reversed(column.rsplit('_', 1))) for column in rollup.columns])
+            rollup = rollup[[statistic for statistic in STATISTICS]]
+        rollups[path.stem] = rollup
+    return rollups
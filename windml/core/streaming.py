@@ -0,0 +1,338 @@
+import os
+from functools import partial
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+from .functions import (DTYPES, DATE_FORMAT, CALENDAR_COLUMNS, list_csv_files, polish_data, _with_date_column,
+                        find_highly_correlated_variables)
+
+STATISTICS = ['sum', 'count', 'min', 'max']
+
+
+def iter_chunks(source, chunksize=100_000, columns=None):
+    """
+    Reads turbine CSV files chunk by chunk and applies polish_data to every chunk.
+
+    Only one chunk is held in memory at a time, so arbitrarily large datasets can be processed
+    on a fixed memory budget.
+
+    Parameters:
+    - source (str or list): A CSV file, a folder of turbine CSV files (starting with 'R'), or a list of files.
+    - chunksize (int): Number of rows per chunk. Default is 100000.
+    - columns (list, optional): Subset of columns to read. 'Date_time' is always read.
+
+    Yields:
+    - DataFrame: A polished chunk, with the datetime index and the calendar columns of polish_data.
+
+    Example:
+    >>> for chunk in iter_chunks('path/to/data', chunksize=50000, columns=['Wind_turbine_name', 'P_avg']):
+    ...     print(len(chunk))
+    """
+
+    if isinstance(source, (list, tuple)):
+        files = list(source)
+    elif os.path.isdir(source):
+        files = list_csv_files(source)
+    else:
+        files = [source]
+
+    usecols = _with_date_column(columns)
+    for file in files:
+        reader = pd.read_csv(file,
+                             dtype=DTYPES,
+                             usecols=usecols,
+                             parse_dates=['Date_time'],
+                             date_format=DATE_FORMAT,
+                             chunksize=chunksize)
+        with reader:
+            for chunk in reader:
+                yield polish_data(chunk)
+
+
+def partial_aggregate(chunk, value_cols, by=('Wind_turbine_name', 'Year', 'Month')):
+    """
+    Computes the partial statistics (sum, count, min, max) of a chunk, grouped by the given keys.
+
+    Partial results of different chunks can be combined with merge_partials. The mean is only
+    derived at the end (see finalize_aggregate), since means of chunks cannot be merged directly.
+
+    Parameters:
+    - chunk (DataFrame): A polished chunk of data.
+    - value_cols (list): Columns to aggregate.
+    - by (tuple): Grouping columns. Default is ('Wind_turbine_name', 'Year', 'Month').
+
+    Returns:
+    - DataFrame: Partial statistics indexed by the grouping keys, with (statistic, column) columns.
+    """
+
+    grouped = chunk.groupby(list(by), observed=True)[list(value_cols)]
+    return pd.concat({statistic: grouped.agg(statistic) for statistic in STATISTICS}, axis=1)
+
+
+def merge_partials(partials):
+    """
+    Merges partial statistics computed by partial_aggregate on different chunks, files or workers.
+
+    Parameters:
+    - partials (list): DataFrames returned by partial_aggregate (or by a previous merge_partials).
+
+    Returns:
+    - DataFrame: The combined partial statistics, one row per group.
+    """
+
+    stacked = pd.concat(partials)
+    levels = list(range(stacked.index.nlevels))
+    return pd.concat({
+        'sum': stacked['sum'].groupby(level=levels).sum(),
+        'count': stacked['count'].groupby(level=levels).sum(),
+        'min': stacked['min'].groupby(level=levels).min(),
+        'max': stacked['max'].groupby(level=levels).max(),
+    }, axis=1)
+
+
+def finalize_aggregate(merged):
+    """
+    Turns merged partial statistics into a flat DataFrame with sum, count, mean, min and max per column.
+
+    Parameters:
+    - merged (DataFrame): The output of merge_partials.
+
+    Returns:
+    - DataFrame: One row per group, the grouping keys as columns, and '<column>_<statistic>' columns.
+    """
+
+    result = merged.copy()
+    for column in merged['sum'].columns:
+        result[('mean', column)] = merged[('sum', column)] / merged[('count', column)]
+
+    result.columns = [f'{column}_{statistic}' for statistic, column in result.columns]
+    return result.sort_index().reset_index()
+
+
+def aggregate_stream(chunks, value_cols, by=('Wind_turbine_name', 'Year', 'Month')):
+    """
+    Aggregates a stream of chunks incrementally: every chunk is reduced to its partial statistics,
+    which are merged into a running result. Memory usage only depends on the chunk size and the
+    number of groups, not on the length of the stream.
+
+    Parameters:
+    - chunks (iterable): Polished chunks, e.g. from iter_chunks.
+    - value_cols (list): Columns to aggregate.
+    - by (tuple): Grouping columns. Default is ('Wind_turbine_name', 'Year', 'Month').
+
+    Returns:
+    - DataFrame: See finalize_aggregate.
+
+    Example:
+    >>> monthly = aggregate_stream(iter_chunks('path/to/data'), ['P_avg', 'Ws_avg'])
+    """
+
+    merged = None
+    for chunk in chunks:
+        partial = partial_aggregate(chunk, value_cols, by=by)
+        merged = partial if merged is None else merge_partials([merged, partial])
+
+    if merged is None:
+        raise ValueError('No data found in the stream.')
+
+    return finalize_aggregate(merged)
+
+
+def monthly_energy(source, p_nom=2050, chunksize=100_000, by=('Wind_turbine_name', 'Year', 'Month')):
+    """
+    Computes the monthly power, energy and capacity factor sums of the Time Series notebook
+    ('P_avg', 'E_avg' = P_avg / 6000 in MWh, 'CF_avg' = P_avg / P_nom) by streaming over the CSV files.
+
+    Parameters:
+    - source (str or list): A CSV file, a folder of turbine CSV files, or a list of files.
+    - p_nom (float): Nominal power of the turbines in kW. Default is 2050.
+    - chunksize (int): Number of rows per chunk. Default is 100000.
+    - by (tuple): Grouping columns. Default is ('Wind_turbine_name', 'Year', 'Month').
+
+    Returns:
+    - DataFrame: One row per group with the columns 'P_avg', 'E_avg' and 'CF_avg', plus 'n_samples'.
+    """
+
+    # Calendar columns are added by polish_data, only the other keys are read from the files
+    columns = [column for column in by if column not in CALENDAR_COLUMNS] + ['P_avg']
+    chunks = iter_chunks(source, chunksize=chunksize, columns=columns)
+    aggregate = aggregate_stream(chunks, ['P_avg'], by=by)
+
+    monthly_df = aggregate[list(by)].copy()
+    monthly_df['P_avg'] = aggregate['P_avg_sum']
+    monthly_df['E_avg'] = aggregate['P_avg_sum'] / 6000  # from kW to MWh
+    monthly_df['CF_avg'] = aggregate['P_avg_sum'] / p_nom
+    monthly_df['n_samples'] = aggregate['P_avg_count']
+
+    return monthly_df
+
+
+def correlation_stats(chunk, columns, shift=None):
+    """
+    Computes the sufficient statistics of the Pearson correlation matrix of a chunk: for every pair of
+    columns, the number of rows where both are present and the sums of x, x^2 and x*y over those rows.
+    Statistics of different chunks, files or workers are merged by adding them (merge_correlation_stats),
+    and the resulting matrix equals df.corr() on the concatenated data (pairwise complete observations).
+
+    Correlations do not depend on a constant shift of the columns. Shifting every column by a value
+    close to its mean (the same for all the merged statistics) avoids the loss of precision of the
+    sums of squares on columns with a large mean, such as 'Date_time_nr'.
+
+    Parameters:
+    - chunk (DataFrame): A chunk of data.
+    - columns (list): Numeric columns of the correlation matrix.
+    - shift (array, optional): Value subtracted from each column. Default is None (no shift).
+
+    Returns:
+    - dict: The statistics, with the keys 'columns', 'shift', 'n', 'sx', 'sxx' and 'sxy'.
+    """
+
+    values = chunk[list(columns)].to_numpy(dtype='float64')
+    if shift is not None:
+        values = values - shift
+    present = ~np.isnan(values)
+    values = np.where(present, values, 0.)
+    weights = present.astype('float64')
+
+    return {
+        'columns': list(columns),
+        'shift': shift,
+        'n': weights.T @ weights,
+        'sx': values.T @ weights,  # sx[i, j]: sum of column i over the rows where column j is present
+        'sxx': (values ** 2).T @ weights,
+        'sxy': values.T @ values,
+    }
+
+
+def merge_correlation_stats(stats_list):
+    """
+    Merges correlation statistics computed by correlation_stats on different chunks, files or workers.
+
+    Parameters:
+    - stats_list (list): Statistics returned by correlation_stats or merge_correlation_stats.
+
+    Returns:
+    - dict: The combined statistics.
+    """
+
+    merged = None
+    for stats in stats_list:
+        if merged is None:
+            merged = {key: value.copy() if key in ['n', 'sx', 'sxx', 'sxy'] else value for key, value in stats.items()}
+            continue
+        if stats['columns'] != merged['columns'] or not np.array_equal(stats['shift'], merged['shift']):
+            raise ValueError('Cannot merge correlation statistics computed on different columns or shifts.')
+        for key in ['n', 'sx', 'sxx', 'sxy']:
+            merged[key] += stats[key]
+    return merged
+
+
+def correlation_from_stats(stats):
+    """
+    Builds the Pearson correlation matrix from merged correlation statistics.
+
+    Parameters:
+    - stats (dict): Statistics returned by correlation_stats or merge_correlation_stats.
+
+    Returns:
+    - DataFrame: The correlation matrix, as returned by df.corr().
+    """
+
+    n = stats['n']
+    with np.errstate(divide='ignore', invalid='ignore'):
+        mean_x = stats['sx'] / n
+        mean_y = mean_x.T
+        covariance = stats['sxy'] / n - mean_x * mean_y
+        variance_x = stats['sxx'] / n - mean_x ** 2
+        variance_y = variance_x.T
+        correlation = covariance / np.sqrt(variance_x * variance_y)
+
+    correlation = np.clip(correlation, -1., 1.)
+    np.fill_diagonal(correlation, np.where(np.diag(variance_x) > 0, 1., np.nan))
+    return pd.DataFrame(correlation, index=stats['columns'], columns=stats['columns'])
+
+
+def _file_correlation_stats(file, columns, chunksize, group_col, shift):
+    """Correlation statistics of one file, per group if group_col is given."""
+    stats = {}
+    for chunk in iter_chunks(file, chunksize=chunksize):
+        groups = chunk.groupby(group_col, observed=True) if group_col is not None else [(None, chunk)]
+        for name, group in groups:
+            group_stats = correlation_stats(group, columns, shift=shift)
+            stats[name] = group_stats if name not in stats else merge_correlation_stats([stats[name], group_stats])
+    return stats
+
+
+def streaming_correlation(source, columns=None, chunksize=100_000, n_workers=1, per_turbine=False,
+                          group_col='Wind_turbine_name'):
+    """
+    Computes the correlation matrix of turbine CSV files without loading them: every file is read chunk
+    by chunk, reduced to sufficient statistics (see correlation_stats), and the statistics of all chunks,
+    files and turbines are merged. Files are processed in parallel by n_workers processes.
+
+    Parameters:
+    - source (str or list): A CSV file, a folder of turbine CSV files, or a list of files.
+    - columns (list, optional): Columns of the matrix. Default is None (all numeric columns, including
+                                the calendar columns of polish_data).
+    - chunksize (int): Number of rows per chunk. Default is 100000.
+    - n_workers (int): Number of files processed in parallel. Default is 1.
+    - per_turbine (bool): If True, one matrix per turbine is returned. Default is False.
+    - group_col (str): Column identifying the turbines. Default is 'Wind_turbine_name'.
+
+    Returns:
+    - DataFrame or dict: The correlation matrix, or a dictionary turbine -> matrix if per_turbine is True.
+
+    Example:
+    >>> correlation_matrix = streaming_correlation('path/to/data', n_workers=4)
+    >>> find_highly_correlated_variables(correlation_matrix, target_variable='P_avg')
+    """
+
+    if isinstance(source, (list, tuple)):
+        files = list(source)
+    elif os.path.isdir(source):
+        files = list_csv_files(source)
+    else:
+        files = [source]
+
+    first_chunk = next(iter_chunks(files[0], chunksize=1000))
+    if columns is None:
+        columns = list(first_chunk.select_dtypes('number').columns)
+    # Shift of the columns for numerical precision, see correlation_stats
+    shift = np.nan_to_num(first_chunk[columns].astype('float64').mean().to_numpy())
+
+    file_stats = partial(_file_correlation_stats, columns=columns, chunksize=chunksize,
+                         group_col=group_col if per_turbine else None, shift=shift)
+    if n_workers > 1:
+        with ProcessPoolExecutor(max_workers=n_workers) as pool:
+            results = list(pool.map(file_stats, files))
+    else:
+        results = [file_stats(file) for file in files]
+
+    merged = {}
+    for stats in results:
+        for name, group_stats in stats.items():
+            merged[name] = group_stats if name not in merged else merge_correlation_stats([merged[name], group_stats])
+
+    if per_turbine:
+        return {name: correlation_from_stats(stats) for name, stats in merged.items()}
+    return correlation_from_stats(merged[None])
+
+
+def rank_correlated_variables(source, target_variable='P_avg', correlation_threshold=0.1, **kwargs):
+    """
+    Streams over turbine CSV files to compute the correlation matrix (see streaming_correlation) and
+    ranks the variables correlated with a target (see find_highly_correlated_variables).
+
+    Parameters:
+    - source (str or list): A CSV file, a folder of turbine CSV files, or a list of files.
+    - target_variable (str): The target column. Default is 'P_avg'.
+    - correlation_threshold (float): The minimum absolute correlation value to consider. Default is 0.1.
+    - kwargs: Other arguments of streaming_correlation (columns, chunksize, n_workers).
+
+    Returns:
+    - tuple: The correlation matrix and the ranked variables DataFrame.
+    """
+
+    correlation_matrix = streaming_correlation(source, **kwargs)
+    return correlation_matrix, find_highly_correlated_variables(correlation_matrix, target_variable,
+                                                                correlation_threshold)
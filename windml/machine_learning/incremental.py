@@ -0,0 +1,219 @@
+import joblib
+import pandas as pd
+import xgboost as xgb
+from statsmodels.iolib.smpickle import load_pickle
+from statsmodels.tsa.ar_model import AutoReg
+from statsmodels.tsa.arima.model import ARIMA
+from .time_analysis import _monthly_dates
+
+
+def monthly_series(df, value_col):
+    """
+    Converts a DataFrame with Year and Month columns to a monthly time series (month start frequency),
+    as required to append new observations to a fitted model.
+
+    Parameters:
+    - df: DataFrame containing the time series data, with Year and Month columns.
+    - value_col: String, the name of the column in df that contains the time series values.
+
+    Returns:
+    - Series: The values indexed by month, missing months set to NaN.
+    """
+    series = pd.Series(df[value_col].to_numpy(), index=pd.DatetimeIndex(_monthly_dates(df)), name=value_col)
+    return series.sort_index().asfreq('MS')
+
+
+def fit_forecaster(df, value_col, method='arima', lags=5, order=(1, 1, 1)):
+    """
+    Fits an AR or ARIMA model on the whole history, to be saved and updated later with update_forecaster.
+
+    Parameters:
+    - df: DataFrame containing the time series data, with Year and Month columns.
+    - value_col: String, the name of the column in df that contains the time series values.
+    - method: 'ar' or 'arima'. Default is 'arima'.
+    - lags: The number of lagged observations of the AR model.
+    - order: The (p,d,q) order of the ARIMA model.
+
+    Returns:
+    - The fitted statsmodels results.
+    """
+
+    series = monthly_series(df, value_col)
+    if method == 'ar':
+        return _with_history(AutoReg(series, lags=lags).fit(), series)
+    if method == 'arima':
+        return _with_history(ARIMA(series, order=order).fit(), series)
+    raise ValueError(f"Unknown method '{method}', use 'ar' or 'arima'.")
+
+
+def _with_history(results, series):
+    """
+    Keeps the whole monthly series with the results (saved with them by save_model): extended ARIMA results
+    only hold the months of their last update.
+    """
+    results._monthly_history = series
+    return results
+
+
+def _history(results, known):
+    """Whole monthly series of results, known being the months they filtered."""
+    history = getattr(results, '_monthly_history', None)
+    if history is not None:
+        return history
+    # Results not fitted by fit_forecaster: AR and ARIMA results that were not extended hold the whole series
+    initialization = getattr(getattr(results.model, 'ssm', None), 'initialization', None)
+    if getattr(initialization, 'initialization_type', None) == 'known':
+        return None
+    return known
+
+
+def update_forecaster(results, new_df, value_col, refit=False):
+    """
+    Updates a fitted AR/ARIMA model with new observations, without refitting it on the whole history.
+
+    ARIMA models are extended: the state of the Kalman filter at the end of the previous data is carried
+    over and only the new observations are filtered, with the previously estimated parameters, so the
+    cost depends on the number of new months only. AR models are cheap to evaluate and are appended
+    (the parameters are kept, the filter runs on the whole series). Use refit=True to re-estimate the
+    parameters on the whole series once in a while: the series is kept with the results returned by
+    fit_forecaster and update_forecaster.
+
+    Months of new_df already known by the model replace the known values when they differ, e.g. the last
+    month, partial when the model was updated, and complete now. The months filtered by the last update
+    (or by fit_forecaster) are filtered again with the corrected values, so ARIMA models can only correct
+    the months of their last update, unless refit=True.
+
+    Parameters:
+    - results: Fitted results, from fit_forecaster or a previous update_forecaster.
+    - new_df: DataFrame with the new rows, with Year and Month columns.
+    - value_col: String, the name of the column in new_df that contains the time series values.
+    - refit: If True, the parameters are re-estimated on the whole series. Default is False.
+
+    Returns:
+    - The updated results, whose forecast starts after the last new month.
+    """
+
+    new_series = monthly_series(new_df, value_col)
+    # Months filtered by results: the whole series, or the months of the last update for extended ARIMA results
+    known = results.model.data.orig_endog
+    if isinstance(known, pd.DataFrame):
+        known = known.iloc[:, 0]
+    history = _history(results, known)
+    if history is None:
+        if refit:
+            raise ValueError('The results were extended without their history, the parameters cannot be '
+                             're-estimated on the whole series: fit the model again with fit_forecaster.')
+        history = known
+    last_month = history.index[-1]
+
+    # Known months whose value changed (missing months of new_df are NaN and are not corrections)
+    overlap = new_series[new_series.index <= last_month].dropna()
+    corrections = overlap[overlap.ne(history.reindex(overlap.index))]
+    new_series = new_series[new_series.index > last_month]
+    if corrections.empty and new_series.empty:
+        return results
+
+    series = history.copy()
+    series[corrections.index] = corrections
+    series = pd.concat([series, new_series]).asfreq('MS')
+
+    if refit:
+        # A new model on the whole series, with the specification of results
+        updated = results.apply(series, refit=True)
+    elif corrections.empty:
+        updated = results.append(new_series) if isinstance(results.model, AutoReg) else results.extend(new_series)
+    else:
+        if corrections.index[0] < known.index[0]:
+            raise ValueError(f'Months before {known.index[0]:%Y-%m} were filtered by a previous update and cannot '
+                             f'be corrected without refitting, use refit=True or fit_forecaster.')
+        segment = series[series.index >= known.index[0]]
+        if isinstance(results.model, AutoReg):
+            updated = results.apply(segment)
+        else:
+            # The initial state of the extended model is kept, it is the state at the end of the previous update
+            updated = results.apply(segment, copy_initialization=True)
+    return _with_history(updated, series)
+
+
+def forecast_months(results, value_col, steps=1):
+    """
+    Forecasts the next months of a fitted model.
+
+    Parameters:
+    - results: Fitted results, from fit_forecaster or update_forecaster.
+    - value_col: String, the name of the forecast column, used to name the output column.
+    - steps: Number of months to forecast. Default is 1.
+
+    Returns:
+    - forecast_df: A DataFrame with the columns 'Year', 'Month' and 'pred_<value_col>'.
+    """
+    forecast = results.forecast(steps=steps)
+    return pd.DataFrame({
+        'Year': forecast.index.year,
+        'Month': forecast.index.month,
+        f'pred_{value_col}': forecast.to_numpy(),
+    })
+
+
+def update_xgb(model, X_new, y_new, n_rounds=100, eval_set=None):
+    """
+    Continues the training of a fitted XGBoost regressor on new data: n_rounds trees are added to the
+    existing ones, fitted on the residuals of the current model on the new rows only.
+
+    Parameters:
+    - model: A fitted xgb.XGBRegressor.
+    - X_new: Features of the new rows.
+    - y_new: Target of the new rows.
+    - n_rounds: Number of boosting rounds to add. Default is 100.
+    - eval_set: Optional evaluation set, required if the model uses early stopping.
+
+    Returns:
+    - xgb.XGBRegressor: A new regressor with the previous and the new trees.
+    """
+
+    params = model.get_params()
+    params['n_estimators'] = n_rounds
+    if eval_set is None:
+        params['early_stopping_rounds'] = None
+
+    updated_model = type(model)(**params)
+    updated_model.fit(X_new, y_new, xgb_model=model.get_booster(), eval_set=eval_set, verbose=False)
+    return updated_model
+
+
+def save_model(model, path):
+    """
+    Saves a fitted model: XGBoost models in the XGBoost format (use a '.json' or '.ubj' path),
+    scikit-learn estimators (e.g. a fitted GridSearchCV or Pipeline) with joblib (use a '.joblib' path),
+    statsmodels results as a pickle.
+
+    Parameters:
+    - model: A fitted xgb.XGBModel, xgb.Booster, scikit-learn estimator or statsmodels results.
+    - path: Output file.
+    """
+    if isinstance(model, (xgb.XGBModel, xgb.Booster)):
+        model.save_model(path)
+    elif str(path).endswith('.joblib'):
+        joblib.dump(model, path)
+    else:
+        model.save(path)
+
+
+def load_model(path):
+    """
+    Loads a model saved by save_model.
+
+    Parameters:
+    - path: The saved file ('.json' and '.ubj' files are read as XGBoost regressors, '.joblib' files
+            as scikit-learn estimators).
+
+    Returns:
+    - The fitted model.
+    """
+    if str(path).endswith(('.json', '.ubj')):
+        model = xgb.XGBRegressor()
+        model.load_model(path)
+        return model
+    if str(path).endswith('.joblib'):
+        return joblib.load(path)
+    return load_pickle(path)
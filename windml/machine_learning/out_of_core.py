@@ -0,0 +1,216 @@
+import os
+import time
+import shutil
+import tempfile
+import weakref
+import xgboost as xgb
+from ..core.functions import list_csv_files, read_turbine_csv, polish_data, select_time_subset, _with_date_column
+from ..core.instrumentation import span, sample_rss
+
+# Quantized matrices built in this process, reused by later experiments on the same data and settings
+_DMATRIX_CACHE = {}
+
+
+class TurbineBatches(xgb.DataIter):
+    """
+    XGBoost data iterator over turbine CSV files: each batch is one turbine file, read (through the Parquet
+    cache if enabled), polished and restricted to a time range, so that only one file is in memory at a time.
+    """
+
+    def __init__(self, csv_files, x_list, y_variable, start=None, end=None, use_cache=True, cache_dir=None,
+                 cache_prefix=None):
+        self.csv_files = list(csv_files)
+        self.x_list = list(x_list)
+        self.y_variable = y_variable
+        self.start = start
+        self.end = end
+        self.use_cache = use_cache
+        self.cache_dir = cache_dir
+        self.position = 0
+        self.rows = 0
+        super().__init__(cache_prefix=cache_prefix)
+
+    def next(self, input_data):
+        if self.position == len(self.csv_files):
+            return False
+
+        # Calendar features are added by polish_data, the other ones are read from the file
+        columns = [column for column in self.x_list + [self.y_variable]
+                   if column not in ('Year', 'Month', 'DayOfWeek', 'HourOfDay')]
+        df = read_turbine_csv(self.csv_files[self.position], columns=_with_date_column(columns),
+                              use_cache=self.use_cache, cache_dir=self.cache_dir)
+        df = select_time_subset(polish_data(df), start=self.start, end=self.end)
+        df = df.dropna(subset=[self.y_variable])
+
+        input_data(data=df[self.x_list], label=df[self.y_variable])
+        self.rows += len(df)
+        self.position += 1
+        return True
+
+    def reset(self):
+        self.position = 0
+        self.rows = 0
+
+
+def _cache_key(csv_files, x_list, y_variable, start, end, max_bin, external_memory, ref):
+    """Identifies a matrix by its inputs, including the modification time of the files."""
+    files = tuple((os.path.abspath(file), os.stat(file).st_mtime_ns) for file in sorted(csv_files))
+    return (files, tuple(x_list), y_variable, str(start), str(end), max_bin, external_memory,
+            None if ref is None else id(ref))
+
+
+def build_dmatrix(folder_path, x_list, y_variable, start=None, end=None, max_bin=256, external_memory=False,
+                  ref=None, use_cache=True, cache_dir=None, page_dir=None, reuse=True):
+    """
+    Builds a quantized XGBoost matrix for the 'hist' tree method by streaming the turbine files one by one
+    (see TurbineBatches), without ever concatenating them in a DataFrame or copying them into a float matrix.
+
+    With external_memory=False the result is a QuantileDMatrix: the batches are read twice (once for the
+    quantiles, once to quantize them) and only the compressed bin indices stay in memory. With
+    external_memory=True the quantized pages are written to disk (page_dir) and streamed during training,
+    so the training set can be larger than the memory.
+
+    The matrix is kept in memory and returned again by later calls with the same files (unchanged on disk)
+    and settings, so several experiments on the same data only pay the build once.
+
+    Parameters:
+    - folder_path (str): The folder of the turbine CSV files.
+    - x_list (list): Feature columns, e.g. ['Ws_avg', 'Year', 'Month', 'DayOfWeek', 'HourOfDay'].
+    - y_variable (str): Target column.
+    - start, end (optional): Time range of the rows (start inclusive, end exclusive). Default is all rows.
+    - max_bin (int): Number of bins of the features. Default is 256.
+    - external_memory (bool): If True, the quantized pages are kept on disk. Default is False.
+    - ref (optional): Matrix whose quantiles are reused, e.g. the training matrix for a validation matrix.
+    - use_cache (bool): If True, the files are read through the Parquet cache. Default is True.
+    - cache_dir (str, optional): Folder holding the Parquet cache files. Default is config.CACHE_DIR.
+    - page_dir (str, optional): Folder of the external memory pages. Default is a temporary folder, removed
+                                when the matrix is released (see clear_dmatrix_cache).
+    - reuse (bool): If True, a matrix built earlier in this process with the same inputs is returned.
+
+    Returns:
+    - tuple: The matrix, and a dictionary with 'rows', 'build_time_s', 'peak_rss_mb' and 'cached'.
+
+    Example:
+    >>> dtrain, report = build_dmatrix('path/to/data', x_list, 'P_avg', end='2017-01-01')
+    >>> dvalid, _ = build_dmatrix('path/to/data', x_list, 'P_avg', start='2017-01-01', ref=dtrain)
+    """
+
+    csv_files = sorted(list_csv_files(folder_path))
+    if not csv_files:
+        raise FileNotFoundError(f'No turbine CSV files found in {folder_path}.')
+
+    key = _cache_key(csv_files, x_list, y_variable, start, end, max_bin, external_memory, ref)
+    if reuse and key in _DMATRIX_CACHE:
+        dmatrix, report = _DMATRIX_CACHE[key]
+        return dmatrix, {**report, 'cached': True}
+
+    cache_prefix = None
+    temporary_dir = None
+    if external_memory:
+        if page_dir is None:
+            page_dir = temporary_dir = tempfile.mkdtemp(prefix='windml_xgb_')
+        os.makedirs(page_dir, exist_ok=True)
+        cache_prefix = os.path.join(page_dir, 'pages')
+
+    batches = TurbineBatches(csv_files, x_list, y_variable, start=start, end=end, use_cache=use_cache,
+                             cache_dir=cache_dir, cache_prefix=cache_prefix)
+
+    def build():
+        if not external_memory:
+            return xgb.QuantileDMatrix(batches, max_bin=max_bin, ref=ref)
+        if hasattr(xgb, 'ExtMemQuantileDMatrix'):
+            return xgb.ExtMemQuantileDMatrix(batches, max_bin=max_bin, ref=ref)
+        # Before XGBoost 3.0, external memory matrices are DMatrix built from an iterator with a cache prefix
+        return xgb.DMatrix(batches)
+
+    with span('xgb.build_dmatrix', files=len(csv_files), external_memory=external_memory) as record:
+        start_time = time.perf_counter()
+        with sample_rss() as memory:
+            dmatrix = build()
+        report = {
+            'rows': dmatrix.num_row(),
+            'build_time_s': time.perf_counter() - start_time,
+            'peak_rss_mb': memory['peak_mb'],
+        }
+        record.update(report)
+
+    if temporary_dir is not None:
+        # The temporary pages are removed with the matrix, once it is released by the caller and the cache
+        weakref.finalize(dmatrix, shutil.rmtree, temporary_dir, ignore_errors=True)
+    if reuse:
+        _DMATRIX_CACHE[key] = (dmatrix, report)
+    return dmatrix, {**report, 'cached': False}
+
+
+def clear_dmatrix_cache():
+    """
+    Releases the matrices kept in memory by build_dmatrix. The temporary folders of their external memory pages
+    are removed once the matrices are not used anymore.
+    """
+    _DMATRIX_CACHE.clear()
+
+
+def train_fleet_model(folder_path, x_list, y_variable, split_date, params=None, num_boost_round=1000,
+                      early_stopping_rounds=50, max_bin=256, external_memory=False, use_cache=True, cache_dir=None,
+                      page_dir=None):
+    """
+    Trains one XGBoost model on the full history of every turbine of a folder, with the 'hist' tree method
+    on quantized matrices streamed from the files (see build_dmatrix). Rows before split_date are used for
+    training, the later ones for validation and early stopping, as in the Time Series notebook. A ValueError is
+    raised if either range is empty.
+
+    Parameters:
+    - folder_path (str): The folder of the turbine CSV files.
+    - x_list (list): Feature columns, e.g. ['Year', 'Month', 'DayOfWeek', 'HourOfDay'].
+    - y_variable (str): Target column.
+    - split_date (str): First date of the validation rows.
+    - params (dict, optional): XGBoost parameters, added to the defaults of the notebook
+                               (max_depth=3, learning_rate=0.01).
+    - num_boost_round (int): Maximum number of trees. Default is 1000.
+    - early_stopping_rounds (int): Rounds without improvement of the validation error before stopping.
+    - max_bin (int): Number of bins of the features. Default is 256.
+    - external_memory (bool): If True, the quantized pages are kept on disk. Default is False.
+    - use_cache (bool): If True, the files are read through the Parquet cache. Default is True.
+    - cache_dir (str, optional): Folder holding the Parquet cache files. Default is config.CACHE_DIR.
+    - page_dir (str, optional): Folder of the external memory pages. Default is a temporary folder.
+
+    Returns:
+    - tuple: The trained xgb.Booster, and a report with the build reports of the 'train' and 'valid'
+             matrices, 'train_time_s', 'peak_rss_mb' of the training and 'best_iteration'.
+
+    Example:
+    >>> booster, report = train_fleet_model('path/to/data', ['Year', 'Month', 'DayOfWeek', 'HourOfDay'], 'P_avg',
+    ...                                     split_date='2017-01-01')
+    >>> save_model(booster, 'fleet.ubj')
+    """
+
+    dtrain, train_report = build_dmatrix(folder_path, x_list, y_variable, end=split_date, max_bin=max_bin,
+                                         external_memory=external_memory, use_cache=use_cache,
+                                         cache_dir=cache_dir, page_dir=page_dir)
+    dvalid, valid_report = build_dmatrix(folder_path, x_list, y_variable, start=split_date, max_bin=max_bin,
+                                         external_memory=external_memory, ref=dtrain, use_cache=use_cache,
+                                         cache_dir=cache_dir, page_dir=page_dir)
+    for name, build_report in (('training', train_report), ('validation', valid_report)):
+        if build_report['rows'] == 0:
+            raise ValueError(f'No {name} rows with split_date={split_date}: the {name} range of '
+                             f'{folder_path} is empty.')
+
+    params = {'tree_method': 'hist', 'max_bin': max_bin, 'max_depth': 3, 'learning_rate': 0.01,
+              'objective': 'reg:squarederror', **(params or {})}
+
+    with span('xgb.train', rows=train_report['rows']) as record:
+        start_time = time.perf_counter()
+        with sample_rss() as memory:
+            booster = xgb.train(params, dtrain, num_boost_round=num_boost_round,
+                                evals=[(dtrain, 'train'), (dvalid, 'valid')],
+                                early_stopping_rounds=early_stopping_rounds, verbose_eval=False)
+        record['best_iteration'] = booster.best_iteration
+
+    report = {
+        'train': train_report,
+        'valid': valid_report,
+        'train_time_s': time.perf_counter() - start_time,
+        'peak_rss_mb': memory['peak_mb'],
+        'best_iteration': booster.best_iteration,
+    }
+    return booster, report
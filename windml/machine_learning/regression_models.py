@@ -1,96 +1,344 @@
+import os
+import json
+import tempfile
+from pathlib import Path
+from contextlib import contextmanager
+import time
+import tracemalloc
+import joblib
 import numpy as np
-from sklearn.model_selection import train_test_split, GridSearchCV
+import pandas as pd
+from sklearn.base import clone
+from sklearn.model_selection import train_test_split, GridSearchCV, KFold, ParameterGrid
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+from sklearn.kernel_ridge import KernelRidge
+from sklearn.kernel_approximation import Nystroem, RBFSampler
+from sklearn.linear_model import Ridge
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from ..core.instrumentation import span, sample_rss
 
 
 def learning_curve_with_CV(df, x_list, y_variable, model, param_grid, lc_npoints=6, cv_npoints=5,
-                   cv_scoring='neg_mean_absolute_error'):
+                   cv_scoring='neg_mean_absolute_error', n_jobs=None, cv_n_jobs=None, random_state=42,
+                   checkpoint_dir=None, metrics_only=False, shared_memory=False, dtype='float32', memmap_dir=None):
     """
     Generates a learning curve by training the model on subsets of the data
     and using GridSearchCV to find the best parameters for each subset.
 
+    The subsets are nested: the rows are shuffled once with random_state and every subset is a prefix
+    of the shuffled data, so each smaller sample is contained in the larger ones and the curve is
+    reproducible. Subset sizes are fitted in parallel (n_jobs), as are the grid points and folds of
+    each GridSearchCV (cv_n_jobs). If checkpoint_dir is given, every finished subset size is saved there
+    and an interrupted run resumes from the sizes already computed.
+
+    The fit and predict stages of every subset are recorded as instrumentation spans
+    ('learning_curve_with_CV.fit', 'learning_curve_with_CV.predict', with the size and the MAE) in the
+    process fitting the subset, see windml.core.instrumentation.
+
+    With shared_memory=True, the shuffled features and target are written once to memory-mapped arrays
+    (see shared_training_arrays) and every worker receives zero-copy views of them instead of a pickled
+    copy of its subset: the subsets are prefixes of the memmap, and the train/test split and the
+    cross-validation folds are passed to GridSearchCV as indices. The splits and folds are the same as
+    without shared memory, results only differ by the dtype. Each subset then also reports its
+    'fit_time_s' and 'peak_rss_mb' (the worker and its GridSearchCV processes), and 'shared_mb' and
+    'transfer_time_s' of the shared arrays.
+
     Parameters:
     - model: Unfitted machine learning model (to be wrapped in GridSearchCV).
     - param_grid: Dictionary of parameters to search over for GridSearchCV.
     - lc_npoints: Number of points for the learning curve.
     - cv_npoints: Number of folds for cross-validation in GridSearchCV.
     - cv_scoring: Scoring metric for cross-validation in GridSearchCV.
+    - n_jobs: Number of subset sizes fitted in parallel (joblib convention, -1 for all cores). Default is None (serial).
+    - cv_n_jobs: Number of parallel jobs of each GridSearchCV. Default is None (serial).
+    - random_state: Seed of the shuffling and of the train/test splits. Default is 42.
+    - checkpoint_dir: Folder where finished subset sizes are saved. Default is None (no checkpoints).
+    - metrics_only: If True, only metrics and best parameters are kept, not the y arrays. Default is False.
+    - shared_memory: If True, workers share memory-mapped training arrays. Default is False.
+    - dtype: dtype of the shared arrays, 'float32' halves their size. Default is 'float32'.
+    - memmap_dir: Folder of the shared arrays, ideally on a RAM disk such as /dev/shm. Default is the
+                  temporary folder.
 
     Returns:
     - Dictionary: Subset size mapped to dictionary of metrics and best parameters.
     """
 
-    max_size = len(df)
-    subset_sizes = np.logspace(np.log10(10), np.log10(
-        max_size), num=lc_npoints + 1, dtype=int)
+    subset_sizes = _subset_sizes(len(df), lc_npoints)
+
+    if checkpoint_dir is not None:
+        checkpoint_dir = Path(checkpoint_dir)
+        spec = {
+            'n_rows': len(df), 'x_list': list(x_list), 'y_variable': y_variable, 'model': repr(model),
+            'param_grid': repr(param_grid), 'lc_npoints': lc_npoints, 'cv_npoints': cv_npoints,
+            'cv_scoring': cv_scoring, 'random_state': random_state, 'metrics_only': metrics_only,
+        }
+        if shared_memory:
+            spec['dtype'] = dtype
+        _check_checkpoint_spec(checkpoint_dir, spec)
 
     learning_curve_data = {}
+    pending_sizes = []
+    for size in subset_sizes:
+        checkpoint = _checkpoint_file(checkpoint_dir, size)
+        if checkpoint is not None and checkpoint.exists():
+            learning_curve_data[size] = joblib.load(checkpoint)
+        else:
+            pending_sizes.append(size)
 
-    for size in np.unique(subset_sizes):  # Ensure unique sizes due to rounding
-        subset_df = df.sample(size)
+    # Shuffle once: each subset is a prefix of the same permutation
+    with span('learning_curve_with_CV.sample', rows=len(df)):
+        shuffled_df = df.sample(frac=1, random_state=random_state)
 
-        X = subset_df[x_list]
-        y = subset_df[y_variable].values.reshape(-1, 1)
+    # Largest sizes first, so that the longest fits do not end up last on a single worker
+    if shared_memory:
+        with shared_training_arrays(shuffled_df[x_list], shuffled_df[y_variable].values.reshape(-1, 1),
+                                    dtype=dtype, folder=memmap_dir) as (X_shared, y_shared, transfer):
+            del shuffled_df
+            results = joblib.Parallel(n_jobs=n_jobs)(
+                joblib.delayed(_fit_subset_shared)(X_shared[:size], y_shared[:size], model, param_grid, cv_npoints,
+                                                   cv_scoring, cv_n_jobs, random_state, metrics_only,
+                                                   _checkpoint_file(checkpoint_dir, size), transfer)
+                for size in sorted(pending_sizes, reverse=True))
+    else:
+        results = joblib.Parallel(n_jobs=n_jobs)(
+            joblib.delayed(_fit_subset)(shuffled_df.iloc[:size], x_list, y_variable, model, param_grid, cv_npoints,
+                                        cv_scoring, cv_n_jobs, random_state, metrics_only,
+                                        _checkpoint_file(checkpoint_dir, size))
+            for size in sorted(pending_sizes, reverse=True))
+
+    for result in results:
+        learning_curve_data[result['size']] = result
+
+    return {size: learning_curve_data[size] for size in subset_sizes}
+
+
+def _subset_sizes(max_size, lc_npoints):
+    """Log-spaced subset sizes from 10 to max_size, unique due to rounding."""
+    return [int(size) for size in np.unique(np.logspace(np.log10(10), np.log10(max_size),
+                                                        num=lc_npoints + 1, dtype=int))]
+
+
+def _checkpoint_file(checkpoint_dir, size):
+    """Path of the checkpoint of a subset size, None if checkpoints are disabled."""
+    return None if checkpoint_dir is None else checkpoint_dir / f'size_{size}.joblib'
 
-        X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-        # Use GridSearchCV to find the best model parameters for this subset
+def _check_checkpoint_spec(checkpoint_dir, spec):
+    """Stores the settings of a run in the checkpoint folder, or checks them against the stored ones."""
+    checkpoint_dir.mkdir(parents=True, exist_ok=True)
+    spec_file = checkpoint_dir / 'spec.json'
+    if spec_file.exists():
+        with open(spec_file) as f:
+            stored_spec = json.load(f)
+        if stored_spec != spec:
+            raise ValueError(f'The checkpoints in {checkpoint_dir} were computed with different settings, '
+                             'use another folder or remove it.')
+    else:
+        with open(spec_file, 'w') as f:
+            json.dump(spec, f, indent=2)
+
+
+def _fit_subset(subset_df, x_list, y_variable, model, param_grid, cv_npoints, cv_scoring, cv_n_jobs,
+                random_state, metrics_only, checkpoint):
+    """Fits GridSearchCV on one subset, returns its metrics and saves them to the checkpoint file if any."""
+
+    X = subset_df[x_list]
+    y = subset_df[y_variable].values.reshape(-1, 1)
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=random_state)
+
+    # Use GridSearchCV to find the best model parameters for this subset
+    with span('learning_curve_with_CV.fit', size=len(subset_df), rows=len(X_train)):
         grid_search = GridSearchCV(
-            model, param_grid, cv=cv_npoints, scoring=cv_scoring)
+            model, param_grid, cv=cv_npoints, scoring=cv_scoring, n_jobs=cv_n_jobs)
         grid_search.fit(X_train, y_train)
 
-        y_pred_train = grid_search.predict(X_train)
+    with span('learning_curve_with_CV.predict', size=len(subset_df), rows=len(X_test)) as record:
         y_pred_test = grid_search.predict(X_test)
+        record['mae'] = mean_absolute_error(y_test, y_pred_test)
 
-        learning_curve_data[size] = {
-            'mae': mean_absolute_error(y_test, y_pred_test),
-            'mse': mean_squared_error(y_test, y_pred_test),
-            'R2': r2_score(y_test, y_pred_test),
-            'parameters': grid_search.best_params_,
+    result = {
+        'size': len(subset_df),
+        'mae': mean_absolute_error(y_test, y_pred_test),
+        'mse': mean_squared_error(y_test, y_pred_test),
+        'R2': r2_score(y_test, y_pred_test),
+        'parameters': grid_search.best_params_,
+    }
+    if not metrics_only:
+        result.update({
             'y_train': y_train,
             'y_test': y_test,
-            'y_pred_train': y_pred_train,
+            'y_pred_train': grid_search.predict(X_train),
             'y_pred_test': y_pred_test
-        }
+        })
 
-        print(f"Subset size: {size}, MAE: {learning_curve_data[size]['mae']}")
+    _save_checkpoint(result, checkpoint)
+    return result
 
-    return learning_curve_data
 
-def learning_curve(df, x_list, y_variable, grid_results, lc_npoints=6):
+def _fit_subset_shared(X, y, model, param_grid, cv_npoints, cv_scoring, cv_n_jobs, random_state, metrics_only,
+                       checkpoint, transfer):
+    """
+    Same as _fit_subset on shared (memory-mapped) arrays: X and y are never copied as a whole, the GridSearchCV
+    workers receive views of them and the train/test split and folds as indices.
+    """
+
+    def fit():
+        # Same split as train_test_split on the arrays, and same folds as GridSearchCV(cv=cv_npoints)
+        train_idx, test_idx = train_test_split(np.arange(len(X)), test_size=0.2, random_state=random_state)
+        folds = [(train_idx[train], train_idx[test]) for train, test in KFold(cv_npoints).split(train_idx)]
+
+        # refit=False: GridSearchCV would refit on the whole X, test rows included
+        grid_search = GridSearchCV(model, param_grid, cv=folds, scoring=cv_scoring, n_jobs=cv_n_jobs, refit=False)
+        grid_search.fit(X, y)
+        best_model = clone(model).set_params(**grid_search.best_params_).fit(X[train_idx], y[train_idx])
+        return grid_search.best_params_, best_model, train_idx, test_idx
+
+    with span('learning_curve_with_CV.fit', size=len(X), shared_memory=True) as record:
+        start_time = time.perf_counter()
+        with sample_rss() as memory:
+            best_params, best_model, train_idx, test_idx = fit()
+        fit_time = time.perf_counter() - start_time
+        record['rows'] = len(train_idx)
+
+    with span('learning_curve_with_CV.predict', size=len(X), rows=len(test_idx)) as record:
+        y_test = np.asarray(y[test_idx])
+        y_pred_test = best_model.predict(X[test_idx])
+        record['mae'] = mean_absolute_error(y_test, y_pred_test)
+
+    result = {
+        'size': len(X),
+        'mae': mean_absolute_error(y_test, y_pred_test),
+        'mse': mean_squared_error(y_test, y_pred_test),
+        'R2': r2_score(y_test, y_pred_test),
+        'parameters': best_params,
+        'fit_time_s': fit_time,
+        'peak_rss_mb': memory['peak_mb'],
+        **transfer,
+    }
+    if not metrics_only:
+        result.update({
+            'y_train': np.asarray(y[train_idx]),
+            'y_test': y_test,
+            'y_pred_train': best_model.predict(X[train_idx]),
+            'y_pred_test': y_pred_test
+        })
+
+    _save_checkpoint(result, checkpoint)
+    return result
+
+
+def _save_checkpoint(result, checkpoint):
+    """Saves the result of a subset size, if checkpoints are enabled."""
+    if checkpoint is not None:
+        # Write then rename, an interrupted write must not look like a finished size
+        tmp = checkpoint.with_suffix('.tmp')
+        joblib.dump(result, tmp)
+        os.replace(tmp, checkpoint)
+
+
+@contextmanager
+def shared_training_arrays(X, y, dtype='float32', folder=None):
+    """
+    Writes training arrays to memory-mapped files and yields read-only memmaps of them. joblib (used by
+    GridSearchCV, learning_curve_with_CV, cross_val_score...) hands memmaps, and slices of them, to its
+    worker processes as a reference to the file instead of a pickled copy, so the workers share one copy
+    of the data in the page cache, whatever their number. The files are removed on exit.
+
+    Parameters:
+    - X: Features, a DataFrame or an array.
+    - y: Target, a Series or an array.
+    - dtype: dtype of the shared arrays. Default is 'float32' (half the memory of float64; the SCADA signals
+             have far fewer significant digits), use 'float64' to reproduce in-memory results exactly.
+    - folder: Folder of the memmap files, e.g. '/dev/shm' to keep them in RAM. Default is the temporary folder.
+
+    Yields:
+    - tuple: The X memmap, the y memmap and a dictionary with the size of the shared arrays ('shared_mb')
+             and the time taken to write them ('transfer_time_s').
+
+    Example:
+    >>> with shared_training_arrays(X_train, y_train) as (X_shared, y_shared, transfer):
+    ...     GridSearchCV(model, param_grid, cv=5, n_jobs=-1).fit(X_shared, y_shared)
+    """
+
+    with tempfile.TemporaryDirectory(dir=folder, prefix='windml_shared_') as tmp_dir:
+        start_time = time.perf_counter()
+        shared = []
+        for name, array in (('X', X), ('y', y)):
+            filename = os.path.join(tmp_dir, f'{name}.mmap')
+            array = np.ascontiguousarray(np.asarray(array, dtype=dtype))
+            memmap = np.lib.format.open_memmap(filename, mode='w+', dtype=array.dtype, shape=array.shape)
+            memmap[:] = array
+            memmap.flush()
+            del memmap, array
+            shared.append(np.load(filename, mmap_mode='r'))
+        transfer = {
+            'shared_mb': sum(array.nbytes for array in shared) / (1024 ** 2),
+            'transfer_time_s': time.perf_counter() - start_time,
+        }
+        try:
+            yield shared[0], shared[1], transfer
+        finally:
+            del shared
+
+
+def learning_curve(df, x_list, y_variable, grid_results, lc_npoints=6, shared_memory=False, dtype='float32',
+                   memmap_dir=None):
     """
     Generates a learning curve by training the model on subsets of the data
     and using GridSearchCV to find the best parameters for each subset.
 
+    The sample, fit and predict stages of every subset are recorded as instrumentation spans
+    ('learning_curve.sample', 'learning_curve.fit', 'learning_curve.predict', with the size and the MAE).
+
     Parameters:
     - model: Unfitted machine learning model (to be wrapped in GridSearchCV).
     - param_grid: Dictionary of parameters to search over for GridSearchCV.
     - lc_npoints: Number of points for the learning curve.
     - cv_npoints: Number of folds for cross-validation in GridSearchCV.
     - cv_scoring: Scoring metric for cross-validation in GridSearchCV.
+    - shared_memory: If True, the training arrays are handed to the grid search workers as memory-mapped
+                     arrays (see shared_training_arrays) and 'peak_rss_mb', 'shared_mb' and
+                     'transfer_time_s' are reported for each subset. Default is False.
+    - dtype: dtype of the shared arrays. Default is 'float32'.
+    - memmap_dir: Folder of the shared arrays. Default is the temporary folder.
 
     Returns:
     - Dictionary: Subset size mapped to dictionary of metrics and best parameters.
     """
 
-    max_size = len(df)
-    subset_sizes = np.logspace(np.log10(10), np.log10(
-        max_size), num=lc_npoints + 1, dtype=int)
-
     learning_curve_data = {}
 
-    for size in np.unique(subset_sizes):  # Ensure unique sizes due to rounding
-        subset_df = df.sample(size)
+    for size in _subset_sizes(len(df), lc_npoints):
+        with span('learning_curve.sample', size=size, rows=size):
+            subset_df = df.sample(size)
 
         X = subset_df[x_list]
         y = subset_df[y_variable].values.reshape(-1, 1)
 
         X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
 
-        grid_results.fit(X_train, y_train)
+        memory = {}
+        if shared_memory:
+            with shared_training_arrays(X_train, y_train, dtype=dtype, folder=memmap_dir) as (X_shared, y_shared,
+                                                                                            memory):
+                with span('learning_curve.fit', size=size, rows=len(X_train), shared_memory=True):
+                    with sample_rss() as rss:
+                        grid_results.fit(X_shared, y_shared)
+                    memory['peak_rss_mb'] = rss['peak_mb']
+                with span('learning_curve.predict', size=size, rows=size) as record:
+                    y_pred_train = grid_results.predict(X_shared)
+                    y_pred_test = grid_results.predict(np.asarray(X_test, dtype=dtype))
+                    record['mae'] = mean_absolute_error(y_test, y_pred_test)
+        else:
+            with span('learning_curve.fit', size=size, rows=len(X_train)):
+                grid_results.fit(X_train, y_train)
 
-        y_pred_train = grid_results.predict(X_train)
-        y_pred_test = grid_results.predict(X_test)
+            with span('learning_curve.predict', size=size, rows=size) as record:
+                y_pred_train = grid_results.predict(X_train)
+                y_pred_test = grid_results.predict(X_test)
+                record['mae'] = mean_absolute_error(y_test, y_pred_test)
 
         learning_curve_data[size] = {
             'mae': mean_absolute_error(y_test, y_pred_test),
@@ -100,10 +348,276 @@ def learning_curve(df, x_list, y_variable, grid_results, lc_npoints=6):
             'y_train': y_train,
             'y_test': y_test,
             'y_pred_train': y_pred_train,
-            'y_pred_test': y_pred_test
+            'y_pred_test': y_pred_test,
+            **memory
         }
 
-        print(f"Subset size: {size}, MAE: {learning_curve_data[size]['mae']}")
-
     return learning_curve_data
 
+
+def successive_halving_search(df, x_list, y_variable, model, param_grid, lc_npoints=6, cv_npoints=5,
+                              cv_scoring='neg_mean_absolute_error', eta=3, min_size=None, n_jobs=None,
+                              random_state=42):
+    """
+    Budget-aware alternative to an exhaustive GridSearchCV at every learning curve size: successive halving
+    over the subset sizes of the learning curve. All the parameter combinations are cross-validated on the
+    first size, only the best 1/eta of them go on to the next size, and so on, so poor combinations are
+    stopped after a small sample and the full data is only used for the last survivors. Once a single
+    combination is left, the remaining sizes only fit it, to complete the learning curve.
+
+    The subsets, train/test splits and folds are those of learning_curve_with_CV (prefixes of one shuffle,
+    cross-validation on the training part), so the learning curves can be compared and plotted together.
+    Every size is recorded as an instrumentation span ('successive_halving_search.rung', with the number of
+    combinations evaluated and the MAE), and the whole search as 'successive_halving_search', with the
+    estimated exhaustive time and the time saved.
+
+    Parameters:
+    - df: DataFrame containing the data.
+    - x_list: List of feature columns.
+    - y_variable: Target column.
+    - model: Unfitted machine learning model.
+    - param_grid: Dictionary (or list of dictionaries) of parameters to search over, as for GridSearchCV.
+    - lc_npoints: Number of points of the learning curve, which defines the subset sizes.
+    - cv_npoints: Number of folds for cross-validation.
+    - cv_scoring: Scoring metric for cross-validation, higher is better.
+    - eta: Fraction of the combinations kept at each size is 1/eta. Default is 3.
+    - min_size: Smallest subset size used, smaller sizes of the learning curve are skipped.
+                Default is 1% of the rows (and at least 10 rows per fold).
+    - n_jobs: Number of parallel jobs of the cross-validation. Default is None (serial).
+    - random_state: Seed of the shuffling and of the train/test splits. Default is 42.
+
+    Returns:
+    - Dictionary with:
+        - 'best_params': The best combination on the largest size.
+        - 'learning_curve': Subset size mapped to the metrics and parameters of the best combination,
+                            in the format of learning_curve_with_CV (metrics only).
+        - 'history': DataFrame with the cross-validation score and fit time of every evaluated
+                     (size, combination).
+        - 'time_s': Wall time of the search.
+        - 'exhaustive_time_s': Estimated wall time of cross-validating every combination at every size and
+                               refitting the best one, from the fold times measured by the search.
+        - 'time_saved_s': The difference between the two.
+    """
+
+    candidates = list(ParameterGrid(param_grid))
+    if min_size is None:
+        min_size = max(len(df) // 100, 10 * cv_npoints)
+    subset_sizes = [size for size in _subset_sizes(len(df), lc_npoints) if size >= min(min_size, len(df))]
+
+    # Shuffle once: each subset is a prefix of the same permutation
+    shuffled_df = df.sample(frac=1, random_state=random_state)
+    X_all = shuffled_df[x_list]
+    y_all = shuffled_df[y_variable].values.reshape(-1, 1)
+
+    search_start = time.perf_counter()
+    survivors = list(range(len(candidates)))
+    learning_curve_data = {}
+    history = []
+    exhaustive_time = 0.
+    # Estimate of the exhaustive search: cross-validation time of every combination at every size, plus one
+    # refit per size. The fold times are measured by GridSearchCV for the combinations evaluated at a size,
+    # and derived from the refit time of the best combination for the others (see below).
+    refit_times = {}  # size -> refit time of the best combination
+    cv_times = {}  # size -> {combination: fit and score time of its folds}
+    grid_wall_time, grid_fold_time = 0., 0.
+
+    with span('successive_halving_search', rows=len(df), candidates=len(candidates)) as search_record:
+        for size in subset_sizes:
+            with span('successive_halving_search.rung', size=size, rows=size) as record:
+                X, y = X_all.iloc[:size], y_all[:size]
+                train_idx, test_idx = train_test_split(np.arange(size), test_size=0.2, random_state=random_state)
+                folds = [(train_idx[train], train_idx[test]) for train, test in KFold(cv_npoints).split(train_idx)]
+
+                evaluated = 1
+                cv_times[size] = {}
+                if len(survivors) > 1:
+                    grid_search = GridSearchCV(model, [{name: [value] for name, value in candidates[i].items()}
+                                                       for i in survivors],
+                                               cv=folds, scoring=cv_scoring, n_jobs=n_jobs, refit=False)
+                    grid_start = time.perf_counter()
+                    grid_search.fit(X, y)
+                    grid_wall_time += time.perf_counter() - grid_start
+
+                    results = grid_search.cv_results_
+                    scores = results['mean_test_score']
+                    fold_times = (results['mean_fit_time'] + results['mean_score_time']) * len(folds)
+                    grid_fold_time += fold_times.sum()
+                    for i, score, fit_time, fold_time in zip(survivors, scores, results['mean_fit_time'], fold_times):
+                        history.append({'size': size, 'parameters': candidates[i], 'score': score,
+                                        'fit_time_s': fit_time * len(folds)})
+                        cv_times[size][i] = fold_time
+                    evaluated = len(survivors)
+                    # Keep the best 1/eta, in order of score
+                    order = np.argsort(-scores, kind='stable')
+                    survivors = [survivors[i] for i in order[:max(1, int(np.ceil(len(survivors) / eta)))]]
+
+                best_params = candidates[survivors[0]]
+                refit_start = time.perf_counter()
+                best_model = clone(model).set_params(**best_params).fit(X.iloc[train_idx], y[train_idx])
+                refit_times[size] = time.perf_counter() - refit_start
+
+                # Combinations not cross-validated at this size: each fold fits (k - 1) / k of the rows of the
+                # refit, the fit time growing as rows^p (p measured on the refits of the last two sizes), and
+                # each combination keeps its cost relative to the best one at the last size where both were
+                # cross-validated
+                sizes = sorted(refit_times)
+                exponent = 1.
+                if len(sizes) > 1 and min(refit_times[sizes[-2]], refit_times[size]) > 0:
+                    exponent = np.clip(np.log(refit_times[size] / refit_times[sizes[-2]])
+                                       / np.log(size / sizes[-2]), 1., 3.)
+                best_fold_time = refit_times[size] * len(folds) * ((len(folds) - 1) / len(folds)) ** exponent
+                fold_times = []
+                for i in range(len(candidates)):
+                    if i in cv_times[size]:
+                        fold_times.append(cv_times[size][i])
+                        continue
+                    measured = [times for times in cv_times.values() if i in times and survivors[0] in times]
+                    relative_cost = measured[-1][i] / measured[-1][survivors[0]] if measured else 1.
+                    fold_times.append(best_fold_time * relative_cost)
+
+                # The ratio of wall time to fold time of the grid searches accounts for n_jobs and their overhead
+                wall_ratio = grid_wall_time / grid_fold_time if grid_fold_time else 1.
+                rung_exhaustive_time = wall_ratio * sum(fold_times) + refit_times[size]
+                exhaustive_time += rung_exhaustive_time
+
+                y_test = y[test_idx]
+                y_pred_test = best_model.predict(X.iloc[test_idx])
+                learning_curve_data[size] = {
+                    'size': size,
+                    'mae': mean_absolute_error(y_test, y_pred_test),
+                    'mse': mean_squared_error(y_test, y_pred_test),
+                    'R2': r2_score(y_test, y_pred_test),
+                    'parameters': best_params,
+                    'n_candidates': evaluated,
+                }
+                record.update(candidates=evaluated, mae=learning_curve_data[size]['mae'],
+                              exhaustive_time_s=rung_exhaustive_time)
+
+        search_time = time.perf_counter() - search_start
+        search_record.update(exhaustive_time_s=exhaustive_time, time_saved_s=exhaustive_time - search_time)
+
+    return {
+        'best_params': candidates[survivors[0]],
+        'learning_curve': learning_curve_data,
+        'history': pd.DataFrame(history),
+        'time_s': search_time,
+        'exhaustive_time_s': exhaustive_time,
+        'time_saved_s': exhaustive_time - search_time,
+    }
+
+
+def approx_krr_pipeline(method='nystroem', n_components=500, random_state=42):
+    """
+    Builds a large-n replacement of the KernelRidge pipeline: the RBF kernel is approximated by an
+    explicit feature map with n_components features, followed by a linear Ridge regression.
+
+    Fitting costs O(n * n_components^2) time and O(n * n_components) memory instead of the O(n^3) time
+    and O(n^2) memory of KernelRidge, so it can be trained on millions of rows. The Ridge 'alpha' plays
+    the role of the KernelRidge 'alpha', and the 'gamma' of the feature map the role of the kernel 'gamma'.
+
+    Parameters:
+    - method: 'nystroem' (low-rank approximation of the kernel matrix built on a sample of the data)
+              or 'rff' (random Fourier features). Default is 'nystroem'.
+    - n_components: Number of features of the approximation. Default is 500.
+    - random_state: Seed of the sampling of the features. Default is 42.
+
+    Returns:
+    - Pipeline: Steps 'scaler', 'kernel_features' and 'regressor', usable with GridSearchCV.
+
+    Example:
+    >>> krr_grid_search = GridSearchCV(approx_krr_pipeline(), approx_krr_param_grid(krr_param_grid), cv=5)
+    """
+
+    if method == 'nystroem':
+        kernel_features = Nystroem(kernel='rbf', n_components=n_components, random_state=random_state)
+    elif method == 'rff':
+        kernel_features = RBFSampler(n_components=n_components, random_state=random_state)
+    else:
+        raise ValueError(f"Unknown method '{method}', use 'nystroem' or 'rff'.")
+
+    return Pipeline([
+        ('scaler', StandardScaler()),
+        ('kernel_features', kernel_features),
+        ('regressor', Ridge())
+    ])
+
+
+def approx_krr_param_grid(krr_param_grid):
+    """
+    Translates a parameter grid of the KernelRidge pipeline (e.g. 'regressor__alpha', 'regressor__gamma')
+    to the parameter names of approx_krr_pipeline. The kernel is always RBF, 'regressor__kernel' is dropped.
+
+    Parameters:
+    - krr_param_grid: Dictionary of parameters of the KernelRidge pipeline.
+
+    Returns:
+    - Dictionary: The same grid for approx_krr_pipeline.
+    """
+
+    param_grid = {}
+    for name, values in krr_param_grid.items():
+        if name == 'regressor__gamma':
+            param_grid['kernel_features__gamma'] = values
+        elif name != 'regressor__kernel':
+            param_grid[name] = values
+    return param_grid
+
+
+def compare_krr_approximations(df, x_list, y_variable, sizes=(1000, 5000, 10000), alpha=1e-2, gamma=1e-2,
+                               n_components=500, max_exact_size=20000, random_state=42):
+    """
+    Benchmarks exact KernelRidge against the Nystroem and random Fourier features approximations
+    on growing training sets: test accuracy, fit time and peak memory allocated during the fit.
+
+    Parameters:
+    - df: DataFrame containing the data.
+    - x_list: List of feature columns.
+    - y_variable: Target column.
+    - sizes: Training set sizes. Default is (1000, 5000, 10000).
+    - alpha: Regularization strength, shared by all models. Default is 1e-2.
+    - gamma: RBF kernel coefficient, shared by all models. Default is 1e-2.
+    - n_components: Number of features of the approximations. Default is 500.
+    - max_exact_size: Largest training set fitted with exact KernelRidge. Default is 20000.
+    - random_state: Seed of the sampling and of the train/test split. Default is 42.
+
+    Returns:
+    - DataFrame: One row per (method, size) with 'fit_time_s', 'peak_memory_mb', 'mae' and 'R2'.
+    """
+
+    exact_pipeline = Pipeline([
+        ('scaler', StandardScaler()),
+        ('regressor', KernelRidge(kernel='rbf', alpha=alpha, gamma=gamma))
+    ])
+    pipelines = {'exact': exact_pipeline}
+    for method in ['nystroem', 'rff']:
+        pipelines[method] = approx_krr_pipeline(method, n_components=n_components, random_state=random_state)
+        pipelines[method].set_params(kernel_features__gamma=gamma, regressor__alpha=alpha)
+
+    X_train, X_test, y_train, y_test = train_test_split(df[x_list], df[y_variable].values,
+                                                        test_size=0.2, random_state=random_state)
+
+    records = []
+    for size in sizes:
+        size = min(size, len(X_train))
+        for method, pipeline in pipelines.items():
+            if method == 'exact' and size > max_exact_size:
+                continue
+
+            tracemalloc.start()
+            start_time = time.perf_counter()
+            pipeline.fit(X_train[:size], y_train[:size])
+            fit_time = time.perf_counter() - start_time
+            _, peak_memory = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            y_pred = pipeline.predict(X_test)
+            records.append({
+                'method': method,
+                'size': size,
+                'fit_time_s': fit_time,
+                'peak_memory_mb': peak_memory / (1024 ** 2),
+                'mae': mean_absolute_error(y_test, y_pred),
+                'R2': r2_score(y_test, y_pred),
+            })
+
+    return pd.DataFrame(records)
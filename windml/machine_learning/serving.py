@@ -0,0 +1,313 @@
+"""
+Local prediction server for fitted regression and forecast models.
+
+Concurrent requests to the same model are micro-batched into one vectorized predict call, recent
+predictions are cached by input features, and latency percentiles and throughput are exposed.
+
+Usage:
+    windml-serve --model power_curve=models/krr.joblib --model xgbr=models/xgbr.ubj --port 8050
+
+    curl -X POST localhost:8050/predict/power_curve -d '{"rows": [{"Ws_avg": 7.2, "Rs_avg": 12.1}]}'
+    curl -X POST localhost:8050/predict/arima -d '{"steps": 3}'
+    curl localhost:8050/stats
+"""
+
+import sys
+import json
+import time
+import asyncio
+import argparse
+from collections import OrderedDict, deque
+import numpy as np
+import pandas as pd
+from .incremental import load_model, forecast_months
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed', 500: 'Internal Server Error'}
+
+
+def _feature_names(model):
+    """Feature names the model was fitted with, if any (scikit-learn and XGBoost regressors fitted on DataFrames)."""
+    names = getattr(model, 'feature_names_in_', None)
+    if names is None and hasattr(model, 'best_estimator_'):
+        names = getattr(model.best_estimator_, 'feature_names_in_', None)
+    return None if names is None else [str(name) for name in names]
+
+
+def _is_forecaster(model):
+    """statsmodels results (AR/ARIMA) forecast a number of steps instead of predicting rows."""
+    return hasattr(model, 'forecast')
+
+
+class PredictionServer:
+    """
+    Serves fitted models over HTTP (JSON). Rows of concurrent requests to the same model are queued and
+    predicted together, either when max_batch_size rows are waiting or max_delay_ms after the first one,
+    in a worker thread so that the event loop keeps accepting requests.
+
+    Parameters:
+    - models (dict): Model name mapped to a fitted model or to the path of a model saved by save_model.
+    - max_batch_size (int): Maximum number of rows of a predict call. Default is 256.
+    - max_delay_ms (float): Maximum time a row waits for other rows before its batch is predicted. Default is 5.
+    - cache_size (int): Number of predictions (rows, or forecasts of a number of steps) kept in the LRU cache,
+                        per model. Default is 10000 (0 disables it).
+    - latency_window (int): Number of recent requests used for the latency percentiles. Default is 10000.
+    - max_forecast_steps (int): Maximum number of months of a forecast request. Default is 120.
+    """
+
+    def __init__(self, models, max_batch_size=256, max_delay_ms=5., cache_size=10000, latency_window=10000,
+                 max_forecast_steps=120):
+        self.models = {name: load_model(model) if isinstance(model, str) else model for name, model in models.items()}
+        self.feature_names = {name: _feature_names(model) for name, model in self.models.items()}
+        self.max_batch_size = max_batch_size
+        self.max_delay = max_delay_ms / 1000
+        self.cache_size = cache_size
+        self.max_forecast_steps = max_forecast_steps
+        self.caches = {name: OrderedDict() for name in self.models}
+        self.queues = {}
+        self.workers = []
+        self.latencies = deque(maxlen=latency_window)
+        self.counters = {'requests': 0, 'rows': 0, 'batches': 0, 'batched_rows': 0, 'cache_hits': 0, 'errors': 0}
+        self.started = time.perf_counter()
+
+    # Prediction
+
+    def _cache_put(self, name, key, value):
+        """Stores a prediction in the LRU cache of a model, evicting the least recently used ones."""
+        if not self.cache_size:
+            return
+        cache = self.caches[name]
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.cache_size:
+            cache.popitem(last=False)
+
+    def _rows_to_matrix(self, name, rows):
+        """Converts the rows of a request (lists of values, or dicts keyed by feature name) to a 2D array."""
+        feature_names = self.feature_names[name]
+        if rows and isinstance(rows[0], dict):
+            if feature_names is None:
+                raise ValueError(f"Model '{name}' has no feature names, send the rows as lists of values.")
+            return np.array([[row[feature] for feature in feature_names] for row in rows], dtype='float64')
+        matrix = np.array(rows, dtype='float64')
+        if matrix.ndim != 2 or (feature_names is not None and matrix.shape[1] != len(feature_names)):
+            raise ValueError(f"Model '{name}' expects rows of {len(feature_names or [])} features.")
+        return matrix
+
+    def _predict_batch(self, name, matrix):
+        """One vectorized predict call, with the feature names the model was fitted with."""
+        model = self.models[name]
+        feature_names = self.feature_names[name]
+        X = pd.DataFrame(matrix, columns=feature_names) if feature_names is not None else matrix
+        return np.asarray(model.predict(X), dtype='float64').reshape(len(matrix), -1)[:, 0]
+
+    async def _batch_worker(self, name):
+        """Collects the rows waiting for a model and predicts them together."""
+        queue = self.queues[name]
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.max_delay
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            matrix = np.stack([row for row, _ in batch])
+            try:
+                predictions = await loop.run_in_executor(None, self._predict_batch, name, matrix)
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+
+            self.counters['batches'] += 1
+            self.counters['batched_rows'] += len(batch)
+            for (_, future), prediction in zip(batch, predictions):
+                if not future.done():
+                    future.set_result(float(prediction))
+
+    async def predict(self, name, rows):
+        """
+        Predicts rows with a model, through the cache and the micro-batching queue.
+
+        Parameters:
+        - name (str): The model name.
+        - rows (list): Rows as lists of feature values, or as dicts keyed by feature name.
+
+        Returns:
+        - list: One prediction per row.
+        """
+        matrix = self._rows_to_matrix(name, rows)
+        cache = self.caches[name]
+        loop = asyncio.get_running_loop()
+
+        predictions = [None] * len(matrix)
+        pending = []
+        for i, row in enumerate(matrix):
+            key = row.tobytes()
+            if key in cache:
+                cache.move_to_end(key)
+                predictions[i] = cache[key]
+                self.counters['cache_hits'] += 1
+            else:
+                future = loop.create_future()
+                await self.queues[name].put((row, future))
+                pending.append((i, key, future))
+
+        for i, key, future in pending:
+            predictions[i] = await future
+            self._cache_put(name, key, predictions[i])
+
+        self.counters['rows'] += len(matrix)
+        return predictions
+
+    async def forecast(self, name, steps):
+        """
+        Forecasts the next months with an AR/ARIMA model (see forecast_months), through the LRU cache keyed by
+        number of steps.
+        """
+        if not 1 <= steps <= self.max_forecast_steps:
+            raise ValueError(f'steps must be between 1 and {self.max_forecast_steps}, got {steps}.')
+        cache = self.caches[name]
+        key = ('steps', steps)
+        if key in cache:
+            cache.move_to_end(key)
+            self.counters['cache_hits'] += 1
+            return cache[key]
+
+        loop = asyncio.get_running_loop()
+        forecast = await loop.run_in_executor(None, forecast_months, self.models[name], 'value', steps)
+        forecast = forecast.rename(columns={'pred_value': 'prediction'}).to_dict(orient='records')
+        self._cache_put(name, key, forecast)
+        return forecast
+
+    # Statistics
+
+    def stats(self):
+        """
+        Returns the latency percentiles (ms) of the recent requests, the throughput since the start and the counters.
+        """
+        latencies = np.array(self.latencies) * 1000 if self.latencies else np.array([np.nan])
+        elapsed = time.perf_counter() - self.started
+        return {
+            'models': list(self.models),
+            'uptime_s': elapsed,
+            'p50_ms': float(np.percentile(latencies, 50)),
+            'p99_ms': float(np.percentile(latencies, 99)),
+            'requests_per_s': self.counters['requests'] / elapsed,
+            'rows_per_s': self.counters['rows'] / elapsed,
+            'mean_batch_size': self.counters['batched_rows'] / max(1, self.counters['batches']),
+            **self.counters,
+        }
+
+    # HTTP
+
+    async def _handle_request(self, method, path, body):
+        """Dispatches a request, returns the status code and the JSON payload."""
+        parts = path.strip('/').split('/')
+        if method == 'GET' and parts == ['stats']:
+            return 200, self.stats()
+        if method == 'GET' and parts == ['models']:
+            return 200, {name: {'features': self.feature_names[name], 'forecaster': _is_forecaster(model)}
+                         for name, model in self.models.items()}
+        if len(parts) != 2 or parts[0] != 'predict':
+            return 404, {'error': f'Unknown path {path}.'}
+        if method != 'POST':
+            return 405, {'error': 'Use POST to predict.'}
+
+        name = parts[1]
+        if name not in self.models:
+            return 404, {'error': f"Unknown model '{name}'."}
+        try:
+            request = json.loads(body or b'{}')
+            if _is_forecaster(self.models[name]):
+                return 200, {'forecast': await self.forecast(name, int(request.get('steps', 1)))}
+            return 200, {'predictions': await self.predict(name, request['rows'])}
+        except (ValueError, KeyError, TypeError) as error:
+            return 400, {'error': repr(error)}
+
+    async def _handle_connection(self, reader, writer):
+        """Minimal HTTP/1.1 with keep-alive: one JSON request and response at a time per connection."""
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, _ = request_line.decode('latin-1').split(' ', 2)
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    key, _, value = line.decode('latin-1').partition(':')
+                    headers[key.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get('content-length', 0)))
+
+                start_time = time.perf_counter()
+                try:
+                    status, payload = await self._handle_request(method, path, body)
+                except Exception as error:
+                    status, payload = 500, {'error': repr(error)}
+                if status == 200:
+                    self.counters['requests'] += 1
+                    self.latencies.append(time.perf_counter() - start_time)
+                else:
+                    self.counters['errors'] += 1
+
+                content = json.dumps(payload).encode()
+                keep_alive = headers.get('connection', '').lower() != 'close'
+                writer.write(f'HTTP/1.1 {status} {STATUS_TEXT[status]}\r\n'
+                             f'Content-Type: application/json\r\nContent-Length: {len(content)}\r\n'
+                             f'Connection: {"keep-alive" if keep_alive else "close"}\r\n\r\n'.encode() + content)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host='127.0.0.1', port=8050):
+        """Starts the batching workers and the HTTP server, returns the asyncio server."""
+        for name, model in self.models.items():
+            if not _is_forecaster(model):
+                self.queues[name] = asyncio.Queue()
+                self.workers.append(asyncio.create_task(self._batch_worker(name)))
+        self.started = time.perf_counter()
+        return await asyncio.start_server(self._handle_connection, host, port)
+
+    async def serve_forever(self, host='127.0.0.1', port=8050):
+        server = await self.start(host, port)
+        print(f"Serving {', '.join(self.models)} on http://{host}:{port}")
+        async with server:
+            await server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve fitted models with micro-batched predictions.')
+    parser.add_argument('--model', action='append', required=True, metavar='NAME=PATH',
+                        help='Model saved by save_model, can be repeated.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8050)
+    parser.add_argument('--max-batch-size', type=int, default=256)
+    parser.add_argument('--max-delay-ms', type=float, default=5.)
+    parser.add_argument('--cache-size', type=int, default=10000)
+    parser.add_argument('--max-forecast-steps', type=int, default=120)
+    args = parser.parse_args(argv)
+
+    models = dict(model.split('=', 1) for model in args.model)
+    server = PredictionServer(models, max_batch_size=args.max_batch_size, max_delay_ms=args.max_delay_ms,
+                              cache_size=args.cache_size, max_forecast_steps=args.max_forecast_steps)
+    try:
+        asyncio.run(server.serve_forever(args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    sys.exit(main())
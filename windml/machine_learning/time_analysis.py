@@ -1,8 +1,14 @@
+import joblib
+import numpy as np
 import pandas as pd
 from statsmodels.tsa.ar_model import AutoReg
 from statsmodels.tsa.arima.model import ARIMA
 
 
+def _monthly_dates(df):
+    """Builds the first day of each (Year, Month) row as a datetime column, without string parsing."""
+    return pd.to_datetime(pd.DataFrame({'year': df['Year'], 'month': df['Month'], 'day': 1}))
+
 
 def ar_forecast(df, value_col, lags=5, train_size=0.8):
     """
@@ -19,9 +25,8 @@ def ar_forecast(df, value_col, lags=5, train_size=0.8):
     - forecast_df: A DataFrame containing the forecasted values for the test dates.
     """
 
-    # Create a temporary date column for sorting and forecasting
-    df['date'] = pd.to_datetime(df['Year'].astype(
-        str) + '-' + df['Month'].astype(str))
+    # Create a temporary date column for sorting and forecasting (on a copy, df is left untouched)
+    df = df.assign(date=_monthly_dates(df))
 
     # Ensure df is sorted by the new date column
     df = df.sort_values('date').reset_index(drop=True)
@@ -66,8 +71,8 @@ def arima_forecast(df, value_col, order=(1, 1, 1), train_size=0.8):
     - forecast_df: A DataFrame containing the forecasted values for the test dates.
     """
 
-    # Create a temporary date column for sorting and forecasting
-    df['date'] = pd.to_datetime(df['Year'].astype(str) + '-' + df['Month'].astype(str))
+    # Create a temporary date column for sorting and forecasting (on a copy, df is left untouched)
+    df = df.assign(date=_monthly_dates(df))
 
     # Ensure df is sorted by the new date column
     df = df.sort_values('date').reset_index(drop=True)
@@ -91,3 +96,98 @@ def arima_forecast(df, value_col, order=(1, 1, 1), train_size=0.8):
     forecast_df[f'pred_{value_col}'] = forecast_values.values
 
     return forecast_df
+
+
+def batch_forecast(df, value_col, group_col='Wind_turbine_name', method='ar', lags=5, order=(1, 1, 1),
+                   train_size=0.8, n_jobs=-1):
+    """
+    Performs AR or ARIMA forecasting for every group (e.g. every turbine) of a long-format DataFrame,
+    fitting the models of the different groups in parallel.
+
+    Parameters:
+    - df: DataFrame with one row per group and month, and the columns group_col, 'Year', 'Month' and value_col.
+    - value_col: String, the name of the column in df that contains the time series values.
+    - group_col: String, the name of the column identifying the series. Default is 'Wind_turbine_name'.
+    - method: 'ar' (see ar_forecast) or 'arima' (see arima_forecast). Default is 'ar'.
+    - lags: The number of lagged observations of the AR models.
+    - order: The (p,d,q) order of the ARIMA models.
+    - train_size: The proportion of each series to include in the train split.
+    - n_jobs: Number of models fitted in parallel (joblib convention). Default is -1 (all cores).
+
+    Returns:
+    - forecast_df: A DataFrame with the columns group_col, 'Year', 'Month' and 'pred_<value_col>'.
+
+    Example:
+    >>> monthly_df = monthly_energy('path/to/data')
+    >>> forecast_df = batch_forecast(monthly_df, 'E_avg', lags=5)
+    """
+
+    if method == 'ar':
+        forecast, kwargs = ar_forecast, {'lags': lags}
+    elif method == 'arima':
+        forecast, kwargs = arima_forecast, {'order': order}
+    else:
+        raise ValueError(f"Unknown method '{method}', use 'ar' or 'arima'.")
+
+    groups = [(name, group[['Year', 'Month', value_col]]) for name, group in df.groupby(group_col, observed=True)]
+    forecasts = joblib.Parallel(n_jobs=n_jobs)(
+        joblib.delayed(forecast)(group, value_col, train_size=train_size, **kwargs) for _, group in groups)
+
+    return pd.concat([forecast_df.assign(**{group_col: name}) for (name, _), forecast_df in zip(groups, forecasts)],
+                     ignore_index=True)[[group_col, 'Year', 'Month', f'pred_{value_col}']]
+
+
+def ar_lag_sweep(df, value_col, lags_list, train_size=0.8):
+    """
+    Performs AR forecasting (as ar_forecast) for several numbers of lags, building the lagged design
+    matrix once for the largest lag and fitting every model by least squares on its first columns.
+
+    All models are estimated on the same sample, which starts after the largest lag (this corresponds
+    to AutoReg with hold_back=max(lags_list)), so their errors can be compared directly.
+
+    Parameters:
+    - df: DataFrame containing the time series data, with Year and Month columns.
+    - value_col: String, the name of the column in df that contains the time series values.
+    - lags_list: List of numbers of lags.
+    - train_size: The proportion of the dataset to include in the train split.
+
+    Returns:
+    - Dictionary: Number of lags mapped to its forecast DataFrame (same format as ar_forecast).
+
+    Example:
+    >>> forecasts = ar_lag_sweep(monthly_df, 'E_avg', lags_list=[1, 5, 10, 20])
+    """
+
+    df = df.assign(date=_monthly_dates(df)).sort_values('date').reset_index(drop=True)
+
+    split_point = int(len(df) * train_size)
+    series = df[value_col].to_numpy(dtype=float)
+    train = series[:split_point]
+    horizon = len(df) - split_point
+
+    max_lags = max(lags_list)
+    if max_lags >= split_point:
+        raise ValueError(f'The training set ({split_point} rows) is too short for {max_lags} lags.')
+
+    # Shared design matrix: constant, then y(t-1), ..., y(t-max_lags)
+    design = np.column_stack([np.ones(split_point - max_lags)] +
+                             [train[max_lags - lag:split_point - lag] for lag in range(1, max_lags + 1)])
+    target = train[max_lags:]
+
+    forecasts = {}
+    for lags in lags_list:
+        params, *_ = np.linalg.lstsq(design[:, :lags + 1], target, rcond=None)
+
+        # Recursive forecast over the test period
+        history = list(train)
+        predictions = np.empty(horizon)
+        for step in range(horizon):
+            # Most recent value first, matching the column order of the design matrix
+            predictions[step] = params[0] + np.dot(params[1:], history[-1:-lags - 1:-1])
+            history.append(predictions[step])
+
+        forecast_df = df[['Year', 'Month']].iloc[split_point:].copy()
+        forecast_df[f'pred_{value_col}'] = predictions
+        forecasts[lags] = forecast_df
+
+    return forecasts
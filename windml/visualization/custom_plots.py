@@ -1,3 +1,4 @@
+from pathlib import Path
 import numpy as np
 from windrose import WindroseAxes
 from matplotlib import cm
@@ -6,7 +7,7 @@ import seaborn as sns
 from ..config import IMAGES_DIR
 
 
-def plot_monthly_evolution(df_energy, value_col):
+def plot_monthly_evolution(df_energy, value_col, img_dir=IMAGES_DIR):
     """
     Plots the time evolution of a specified value over months and the distribution per month,
     using colormaps for aesthetic adjustments. 'Month' and 'Year' are used for grouping.
@@ -14,6 +15,10 @@ def plot_monthly_evolution(df_energy, value_col):
     Parameters:
     - df_energy: DataFrame containing the data to plot.
     - value_col: The name of the column in df that represents the value to plot (e.g., energy production).
+    - img_dir: Folder where the figure is saved as 'monthly_evolution_<value_col>.jpeg'. Default is IMAGES_DIR.
+
+    Returns:
+    - Figure: The figure of the plot.
     """
     # Set up the figure with two subplots
     f, ax = plt.subplots(2, 1, figsize=(8, 8))
@@ -22,7 +27,6 @@ def plot_monthly_evolution(df_energy, value_col):
     # Creating a normalized month value for colormap
     norm = plt.Normalize(df_energy['Month'].min(), df_energy['Month'].max())
     smap = plt.cm.ScalarMappable(cmap='coolwarm', norm=norm)
-    df_energy['color'] = df_energy['Month'].apply(lambda x: smap.to_rgba(x))
 
     # Scatter plot for annual comparison with connected dots
     for year in df_energy['Year'].unique():
@@ -39,7 +43,8 @@ def plot_monthly_evolution(df_energy, value_col):
 
     # Box plot for monthly distribution using the same colormap concept
     # Since boxplot won't directly use the color mapping, manually assign colors
-    month_colors = df_energy.groupby('Month')['color'].first().values
+    # One colormap lookup for all the months at once
+    month_colors = smap.to_rgba(np.sort(df_energy['Month'].unique()))
     sns.boxplot(x="Month", y=value_col, data=df_energy,
                 ax=ax[1], palette=month_colors)
 
@@ -47,9 +52,9 @@ def plot_monthly_evolution(df_energy, value_col):
     ax[1].set_xlabel('Month')
     ax[1].set_ylabel(f'{value_col}')
 
-    plt.tight_layout()
-    df_energy.drop(columns='color', inplace=True)
-    plt.savefig(img_dir / f'monthly_evolution_{value_col}.jpeg')
+    f.tight_layout()
+    f.savefig(Path(img_dir) / f'monthly_evolution_{value_col}.jpeg')
+    return f
 
 
 def plot_windrose_subplots(data, *, direction, var, **kwargs):
@@ -89,31 +94,147 @@ def plot_learning_curves(lc_tuple, error_metric='mae'):
         errors = [lc_data[size][error_metric] for size in subset_sizes]
         ax.scatter(subset_sizes, errors)
         ax.loglog(subset_sizes, errors, label=lc_name, linestyle='--')
-    plt.xlabel('Subset Size')
-    plt.ylabel(f'{error_metric.upper()}')
-    plt.title('Learning Curve with GridSearchCV')
-    plt.xscale('log')
-    plt.grid(True)
-    plt.legend()
+    ax.set_xlabel('Subset Size')
+    ax.set_ylabel(f'{error_metric.upper()}')
+    ax.set_title('Learning Curve with GridSearchCV')
+    ax.set_xscale('log')
+    ax.grid(True)
+    ax.legend()
     return fig, ax
 
 
-def scatter_plot(y_test, y_pred, title='Actual vs. Predicted', xlabel='True values', ylabel='Predicted values'):
+def scatter_plot(y_test, y_pred, title='Actual vs. Predicted', xlabel='True values', ylabel='Predicted values',
+                 max_points=20000, gridsize=100, img_dir=IMAGES_DIR):
     """
     Plots a scatter plot comparing actual and predicted values.
 
+    Above max_points points, a hexagonal binning (2-D histogram with a logarithmic color scale) is drawn
+    instead: it renders in constant time and still shows where the points concentrate, while a scatter
+    of millions of overlapping markers is slow and saturates.
+
     Parameters:
     - y_test: array-like, true values.
     - y_pred: array-like, predicted values generated by the model.
     - title: string, the title of the plot.
     - xlabel: string, the label for the x-axis.
     - ylabel: string, the label for the y-axis.
+    - max_points: int, largest number of points drawn as a scatter. Default is 20000.
+    - gridsize: int, number of hexagons in the x-direction of the hexagonal binning. Default is 100.
+    - img_dir: Folder where the figure is saved as 'scatter_plot.jpeg'. Default is IMAGES_DIR.
+
+    Returns:
+    - Figure: The figure of the plot.
+    """
+    y_test = np.ravel(y_test)
+    y_pred = np.ravel(y_pred)
+
+    fig, ax = plt.subplots(figsize=(8, 6))
+    if len(y_test) > max_points:
+        hexagons = ax.hexbin(y_test, y_pred, gridsize=gridsize, bins='log', mincnt=1, cmap='viridis')
+        fig.colorbar(hexagons, ax=ax, label='Number of points')
+    else:
+        ax.scatter(y_test, y_pred, alpha=0.5)
+    ax.set_title(title)
+    ax.set_xlabel(xlabel)
+    ax.set_ylabel(ylabel)
+    ax.plot([min(y_test.min(), y_pred.min()), max(y_test.max(), y_pred.max())],
+            [min(y_test.min(), y_pred.min()), max(y_test.max(), y_pred.max())], 'k--')  # Diagonal line
+    fig.savefig(Path(img_dir) / 'scatter_plot.jpeg')
+    return fig
+
+
+def decimate_minmax(x, y, n_buckets=2000):
+    """
+    Reduces a series to at most 2 * n_buckets points for line plots: the series is split into n_buckets
+    consecutive buckets and only the minimum and the maximum of each bucket are kept, in their original
+    order. At screen resolution the plot looks the same, peaks included, but draws far fewer points.
+
+    Parameters:
+    - x: array-like, x values (e.g. a DatetimeIndex), sorted.
+    - y: array-like, y values. NaN values are dropped.
+    - n_buckets: int, number of buckets. Default is 2000.
+
+    Returns:
+    - tuple: The decimated x and y values.
     """
-    plt.figure(figsize=(8, 6))
-    plt.scatter(y_test, y_pred, alpha=0.5)
-    plt.title(title)
-    plt.xlabel(xlabel)
-    plt.ylabel(ylabel)
-    plt.plot([min(y_test.min(), y_pred.min()), max(y_test.max(), y_pred.max())],
-             [min(y_test.min(), y_pred.min()), max(y_test.max(), y_pred.max())], 'k--')  # Diagonal line
-    plt.savefig(IMAGES_DIR / 'scatter_plot.jpeg')
+
+    x = np.asarray(x)
+    y = np.asarray(y, dtype='float64')
+    if len(y) <= 2 * n_buckets:
+        return x, y
+
+    bucket_size = int(np.ceil(len(y) / n_buckets))
+    n_buckets = int(np.ceil(len(y) / bucket_size))
+    padded = np.full(n_buckets * bucket_size, np.nan)
+    padded[:len(y)] = y
+    buckets = padded.reshape(n_buckets, bucket_size)
+
+    starts = np.arange(n_buckets) * bucket_size
+    positions = np.concatenate([starts + np.argmin(np.where(np.isnan(buckets), np.inf, buckets), axis=1),
+                                starts + np.argmax(np.where(np.isnan(buckets), -np.inf, buckets), axis=1)])
+    positions = np.unique(positions[positions < len(y)])
+    positions = positions[~np.isnan(y[positions])]
+
+    return x[positions], y[positions]
+
+
+def plot_time_series(df, y, ax=None, max_points=4000, **kwargs):
+    """
+    Plots a column of a DataFrame against its index, decimated with decimate_minmax when it has more
+    than max_points rows. It replaces df.plot(y=...) for long 10-minute series.
+
+    Parameters:
+    - df: DataFrame indexed by datetime.
+    - y: string, the column to plot.
+    - ax: matplotlib Axes to draw on. Default is the current Axes.
+    - max_points: int, largest number of points drawn. Default is 4000.
+    - kwargs: Other arguments of ax.plot (label, color, ...).
+
+    Returns:
+    - Axes: The Axes of the plot.
+    """
+
+    ax = ax if ax is not None else plt.gca()
+    x_values, y_values = decimate_minmax(df.index, df[y].to_numpy(), n_buckets=max_points // 2)
+    ax.plot(x_values, y_values, **kwargs)
+    return ax
+
+
+def plot_windrose_binned(counts, ax=None, cmap=cm.hot, rmax=None):
+    """
+    Draws a windrose from pre-binned counts (see windml.core.rollups.windrose_histogram) as stacked bars,
+    without going through the raw records.
+
+    Parameters:
+    - counts: DataFrame of one turbine, one row per direction sector (index in degrees) and one
+              column per speed bin (its lower edge), e.g. rollups['windrose'].loc['R80711'].
+    - ax: Polar Axes to draw on. Default is a new polar subplot of the current figure.
+    - cmap: Colormap of the speed bins. Default is cm.hot.
+    - rmax: Maximum radial value. Default is None (automatic).
+
+    Returns:
+    - Axes: The Axes of the plot.
+    """
+
+    ax = ax if ax is not None else plt.gcf().add_subplot(projection='polar')
+
+    directions = np.radians(counts.index.to_numpy(dtype='float64'))
+    width = 2 * np.pi / len(directions)
+    values = counts.to_numpy(dtype='float64')
+    edges = list(counts.columns)
+    colors = cmap(np.linspace(0, 1, len(edges)))
+
+    bottom = np.zeros(len(directions))
+    for column, edge in enumerate(edges):
+        label = f'[{edge} : {edges[column + 1]})' if column + 1 < len(edges) else f'[{edge} : inf)'
+        ax.bar(directions, values[:, column], width=width, bottom=bottom, color=colors[column],
+               edgecolor='black', linewidth=0.5, label=label)
+        bottom += values[:, column]
+
+    if rmax is not None:
+        ax.set_rmax(rmax)
+    # Set the direction of the angular axis (clockwise) and its zero location (north)
+    ax.set_theta_direction(-1)
+    ax.set_theta_zero_location('N')
+    ax.legend(loc='lower left', bbox_to_anchor=(1.05, 0.), fontsize='small')
+    return ax
@@ -0,0 +1,296 @@
+"""
+Headless report runner: loads the turbine data once and renders the report figures of every turbine
+in a process pool, with the Agg backend.
+
+Usage:
+    windml-report --data-dir data --output-dir reports --workers 4
+    python -m windml.visualization.report --data-dir data --figures monthly_evolution windrose
+"""
+
+import os
+import sys
+import json
+import hashlib
+import argparse
+from pathlib import Path
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
+import matplotlib
+import pandas as pd
+import matplotlib.pyplot as plt
+import seaborn as sns
+from ..config import DATA_DIR, IMAGES_DIR
+from . import custom_plots
+
+FIGURES = ['monthly_evolution', 'windrose', 'heatmap', 'learning_curve', 'scatter_plot', 'XGBR']
+# File written by each figure in the folder of its turbine
+OUTPUT_FILES = {
+    'monthly_evolution': 'monthly_evolution_P_avg.jpeg',
+    'windrose': 'windrose.jpeg',
+    'heatmap': 'heatmap.jpeg',
+    'learning_curve': 'learning_curve.jpeg',
+    'scatter_plot': 'scatter_plot.jpeg',
+    'XGBR': 'XGBR.jpeg',
+}
+MANIFEST = 'manifest.json'
+
+# Settings of the Machine Learning and Time Series notebooks
+X_LIST = ['Ws_avg', 'Rs_avg', 'Yt_avg', 'Ba_avg']
+Y_VARIABLE = 'P_avg'
+CALENDAR_X_LIST = ['Year', 'Month', 'DayOfWeek', 'HourOfDay']
+ML_SAMPLE_SIZE = 10000
+
+
+def _monthly_evolution(data, output_dir):
+    return custom_plots.plot_monthly_evolution(data, 'P_avg', img_dir=output_dir)
+
+
+def _windrose(data, output_dir):
+    fig = plt.figure(figsize=(8, 8))
+    custom_plots.plot_windrose_binned(data, ax=fig.add_subplot(projection='polar'))
+    fig.savefig(output_dir / 'windrose.jpeg', bbox_inches='tight')
+    return fig
+
+
+def _heatmap(data, output_dir):
+    fig, ax = plt.subplots(figsize=(12, 10))
+    sns.heatmap(data.corr(), ax=ax, cmap='coolwarm', vmin=-1, vmax=1)
+    fig.tight_layout()
+    fig.savefig(output_dir / 'heatmap.jpeg')
+    return fig
+
+
+def _learning_curve(data, output_dir):
+    from sklearn.linear_model import LinearRegression
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import PolynomialFeatures
+    from ..machine_learning.regression_models import learning_curve_with_CV, approx_krr_pipeline
+
+    models = [
+        ('Lin', Pipeline([('regressor', LinearRegression())]), {'regressor__fit_intercept': [True, False]}),
+        ('Poly', Pipeline([('poly_features', PolynomialFeatures()), ('regressor', LinearRegression())]),
+         {'poly_features__degree': [1, 2, 3]}),
+        ('KRR (Nystroem)', approx_krr_pipeline(n_components=200),
+         {'regressor__alpha': [1e-4, 1e-2, 1], 'kernel_features__gamma': [1e-2, 1]}),
+    ]
+    lc_tuple = [(learning_curve_with_CV(data, X_LIST, Y_VARIABLE, model, param_grid, cv_npoints=3,
+                                        metrics_only=True), name)
+                for name, model, param_grid in models]
+
+    fig, _ = custom_plots.plot_learning_curves(lc_tuple)
+    fig.savefig(output_dir / 'learning_curve.jpeg')
+    return fig
+
+
+def _scatter_plot(data, output_dir):
+    from sklearn.linear_model import LinearRegression
+    from sklearn.model_selection import train_test_split
+    from sklearn.pipeline import Pipeline
+    from sklearn.preprocessing import PolynomialFeatures
+
+    X_train, X_test, y_train, y_test = train_test_split(data[X_LIST], data[Y_VARIABLE].to_numpy(),
+                                                        test_size=0.2, random_state=42)
+    model = Pipeline([('poly_features', PolynomialFeatures(degree=3)), ('regressor', LinearRegression())])
+    model.fit(X_train, y_train)
+    return custom_plots.scatter_plot(y_test, model.predict(X_test), img_dir=output_dir)
+
+
+def _xgbr(data, output_dir):
+    import xgboost as xgb
+
+    split_date = data.index[int(len(data) * 0.8)]
+    train = data.loc[data.index < split_date]
+    test = data.loc[data.index >= split_date]
+
+    reg = xgb.XGBRegressor(n_estimators=1000, early_stopping_rounds=50, max_depth=3, learning_rate=0.01)
+    reg.fit(train[CALENDAR_X_LIST], train[Y_VARIABLE], eval_set=[(test[CALENDAR_X_LIST], test[Y_VARIABLE])],
+            verbose=False)
+    prediction = pd.DataFrame({'True': test[Y_VARIABLE], 'Pred.': reg.predict(test[CALENDAR_X_LIST])},
+                              index=test.index)
+
+    fig, ax = plt.subplots(figsize=(15, 5))
+    custom_plots.plot_time_series(prediction, 'True', ax=ax, label='True')
+    custom_plots.plot_time_series(prediction, 'Pred.', ax=ax, label='Pred.')
+    ax.axvline(split_date, color='black', ls='--')
+    ax.legend()
+    fig.savefig(output_dir / 'XGBR.jpeg')
+    return fig
+
+
+RENDERERS = {
+    'monthly_evolution': _monthly_evolution,
+    'windrose': _windrose,
+    'heatmap': _heatmap,
+    'learning_curve': _learning_curve,
+    'scatter_plot': _scatter_plot,
+    'XGBR': _xgbr,
+}
+
+
+def figure_inputs(df, rollups, turbine):
+    """
+    Extracts the inputs of every report figure of a turbine, so that workers only receive the data
+    they draw and the inputs can be hashed to detect changes.
+
+    Parameters:
+    - df (DataFrame): The data of all the turbines, processed by polish_data.
+    - rollups (dict): Rollups of df (see windml.core.rollups.build_rollups).
+    - turbine (str): The turbine name.
+
+    Returns:
+    - dict: Figure name mapped to its input DataFrame.
+    """
+    from ..core.functions import select_time_subset
+    from ..core.rollups import rollup_energy
+
+    turbine_df = select_time_subset(df, turbine=turbine)
+    monthly_df = rollup_energy(rollups['monthly'])
+    ml_df = turbine_df[X_LIST + [Y_VARIABLE]].dropna()
+
+    return {
+        'monthly_evolution': monthly_df[monthly_df['Wind_turbine_name'] == turbine].drop(columns='Wind_turbine_name'),
+        'windrose': rollups['windrose'].loc[turbine],
+        'heatmap': turbine_df[[column for column in turbine_df.columns if column.endswith('_avg')]],
+        'learning_curve': ml_df.sample(min(ML_SAMPLE_SIZE, len(ml_df)), random_state=42),
+        'scatter_plot': ml_df,
+        'XGBR': turbine_df[CALENDAR_X_LIST + [Y_VARIABLE]].dropna().sort_index(),
+    }
+
+
+def input_hash(figure, data):
+    """Hash of the input of a figure, the figure is redrawn only when it changes."""
+    digest = hashlib.sha1(figure.encode())
+    digest.update(pd.util.hash_pandas_object(data, index=True).to_numpy().tobytes())
+    digest.update(','.join(map(str, data.columns)).encode())
+    return digest.hexdigest()
+
+
+def render_figure(figure, data, output_dir):
+    """
+    Renders one figure in its own Figure object and closes it, so that memory does not build up
+    when hundreds of figures are drawn by the same process.
+
+    Parameters:
+    - figure (str): Name of the figure, one of FIGURES.
+    - data (DataFrame): The input of the figure (see figure_inputs).
+    - output_dir (Path): Folder of the figure.
+
+    Returns:
+    - str: The name of the figure.
+    """
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    fig = RENDERERS[figure](data, output_dir)
+    plt.close(fig)
+    return figure
+
+
+def _init_worker():
+    matplotlib.use('Agg')
+
+
+def _report_tasks(df, rollups, turbines, figures, manifest, output_dir, counts):
+    """
+    Yields the figures to draw as (key, digest, figure, data, output folder), one turbine at a time, so that
+    only the inputs of the figures being drawn are held in memory. Figures whose inputs are unchanged and
+    whose file exists are counted as skipped.
+    """
+    for turbine in turbines:
+        inputs = figure_inputs(df, rollups, turbine)
+        turbine_dir = output_dir / str(turbine)
+        for figure in figures:
+            key = f'{turbine}/{figure}'
+            digest = input_hash(figure, inputs[figure])
+            if manifest.get(key) == digest and (turbine_dir / OUTPUT_FILES[figure]).exists():
+                counts['skipped'] += 1
+                continue
+            yield key, digest, figure, inputs[figure], turbine_dir
+
+
+def _collect(future, key, digest, manifest, counts):
+    """Records the result of a figure in the manifest and the counts."""
+    try:
+        future.result()
+    except Exception as error:
+        print(f'{key}: failed ({error!r})')
+        manifest.pop(key, None)
+        counts['failed'] += 1
+    else:
+        manifest[key] = digest
+        counts['rendered'] += 1
+
+
+def run_report(data_dir=DATA_DIR, output_dir=IMAGES_DIR / 'reports', figures=FIGURES, turbines=None, workers=None,
+               force=False):
+    """
+    Renders the report figures of every turbine. The data is loaded once (through the Parquet cache),
+    the figures are drawn in a process pool, and the figures whose inputs have not changed since the
+    previous run (see the manifest.json file of output_dir) are skipped. The inputs of the figures are
+    extracted one turbine at a time, while the pool draws the figures already submitted.
+
+    Parameters:
+    - data_dir (str): The folder of the turbine CSV files. Default is config.DATA_DIR.
+    - output_dir (str): The output folder, with one subfolder per turbine. Default is images/reports.
+    - figures (list): Figures to draw. Default is FIGURES.
+    - turbines (list, optional): Turbines to report on. Default is None (all turbines).
+    - workers (int, optional): Number of processes. Default is the number of CPUs.
+    - force (bool): If True, every figure is redrawn. Default is False.
+
+    Returns:
+    - dict: The number of 'rendered', 'skipped' and 'failed' figures.
+    """
+    from ..core.functions import load_all
+    from ..core.rollups import build_rollups
+
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    manifest_file = output_dir / MANIFEST
+    manifest = {}
+    if manifest_file.exists() and not force:
+        with open(manifest_file) as f:
+            manifest = json.load(f)
+
+    df = load_all(data_dir, use_cache=True)
+    rollups = build_rollups(df)
+    turbines = turbines or sorted(df['Wind_turbine_name'].unique())
+
+    counts = {'rendered': 0, 'skipped': 0, 'failed': 0}
+    tasks = _report_tasks(df, rollups, turbines, figures, manifest, output_dir, counts)
+    workers = workers or os.cpu_count()
+
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool:
+        futures = {}
+        for key, digest, figure, data, path in tasks:
+            futures[pool.submit(render_figure, figure, data, path)] = (key, digest)
+            # The pool holds the inputs of the submitted figures until they are drawn: a few figures per
+            # worker are submitted ahead, the next inputs are extracted when one of them is done
+            if len(futures) >= 2 * workers:
+                done, _ = wait(futures, return_when=FIRST_COMPLETED)
+                for future in done:
+                    _collect(future, *futures.pop(future), manifest, counts)
+        for future in as_completed(futures):
+            _collect(future, *futures[future], manifest, counts)
+
+    with open(manifest_file, 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    print(f"{counts['rendered']} figures rendered, {counts['skipped']} unchanged, {counts['failed']} failed.")
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render the report figures of every turbine.')
+    parser.add_argument('--data-dir', default=str(DATA_DIR), help='Folder containing the turbine CSV files.')
+    parser.add_argument('--output-dir', default=str(IMAGES_DIR / 'reports'), help='Output folder.')
+    parser.add_argument('--figures', nargs='+', choices=FIGURES, default=FIGURES)
+    parser.add_argument('--turbines', nargs='+', help='Turbines to report on. Default is all turbines.')
+    parser.add_argument('--workers', type=int, help='Number of processes. Default is the number of CPUs.')
+    parser.add_argument('--force', action='store_true', help='Redraw every figure, even if its inputs are unchanged.')
+    args = parser.parse_args(argv)
+
+    counts = run_report(args.data_dir, args.output_dir, figures=args.figures, turbines=args.turbines,
+                        workers=args.workers, force=args.force)
+    return 1 if counts['failed'] else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())